@@ -0,0 +1 @@
+# Offline NL→SQL evaluation
@@ -0,0 +1,91 @@
+"""Benchmark the few-shot example index as the store grows.
+
+Builds indexes of synthetic questions (golden questions with shuffled words and
+random filler terms), then reports build time, single-add time, query latency
+and memory per store size.
+
+Run from backend/:
+    python -m evaluation.bench_examples
+    python -m evaluation.bench_examples --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import random
+import time
+
+from services.examples import EMBEDDING_DIM, ExampleIndex, golden_examples
+from services.sample_data import DATASETS
+
+FILLER = ["weekly", "average", "total", "latest", "per", "site", "region", "count", "trend", "top",
+          "missed", "late", "officer", "checkpoint", "month", "ratio", "share", "change", "open", "closed"]
+
+
+def synthetic_examples(n: int, rng: random.Random) -> list[dict]:
+    seeds = golden_examples()
+    examples = []
+    for i in range(n):
+        seed = seeds[i % len(seeds)]
+        words = seed["question"].split()
+        rng.shuffle(words)
+        words += rng.sample(FILLER, 3) + [f"term{rng.randrange(n)}"]
+        examples.append({"question": " ".join(words), "sql": seed["sql"], "dataset": seed["dataset"], "added": 0})
+    return examples
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def bench(size: int, queries: int, rng: random.Random) -> dict:
+    examples = synthetic_examples(size, rng)
+    start = time.perf_counter()
+    index = ExampleIndex(examples=examples)
+    index.matrix()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    questions = [e["question"] for e in golden_examples()]
+    datasets = list(DATASETS)
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        index.search(questions[i % len(questions)], datasets[i % len(datasets)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Adds weight only the new rows until the store grows enough to reweight; averaged over
+    # several adds so the occasional buffer doubling is amortized as in a live store
+    adds = 20
+    start = time.perf_counter()
+    for i in range(adds):
+        index.add(f"how many patrols were late in week {i}", "SELECT 1", "security")
+        index.search(questions[i % len(questions)], "security")
+    add_ms = (time.perf_counter() - start) * 1000 / adds
+
+    return {
+        "size": size,
+        "build_ms": build_ms,
+        "query_p50_ms": percentile(latencies, 50),
+        "query_p95_ms": percentile(latencies, 95),
+        "add_then_query_ms": add_ms,
+        "matrix_mb": size * EMBEDDING_DIM * 4 * 2 / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark few-shot example index build and query time")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[100, 1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    header = f"{'examples':>9} {'build ms':>10} {'query p50/p95 ms':>18} {'add+query ms':>13} {'matrix MB':>10}"
+    print(header)
+    print("-" * len(header))
+    for size in args.sizes:
+        r = bench(size, args.queries, rng)
+        print(f"{r['size']:>9} {r['build_ms']:>10.1f} {r['query_p50_ms']:>8.2f}/{r['query_p95_ms']:<9.2f} "
+              f"{r['add_then_query_ms']:>13.1f} {r['matrix_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Offline NL→SQL evaluation against the golden question set.
+
+Generates SQL for every golden question, executes generated and reference SQL
+against the dataset store files in worker processes, and reports execution-match
+accuracy, query runtime, token usage and LLM latency.
+
+Every reference SQL is also checked against the pruned schema the model is
+shown for its question; a failure is a pruning miss. The mock LLM answers with
+the reference SQL whatever the prompt says, so in mock mode a pruning miss
+counts as a wrong answer.
+
+Run from backend/:
+    python -m evaluation.run --llm mock
+    python -m evaluation.run --llm azure --datasets security hr --workers 4
+    python -m evaluation.run --replay llm-log.jsonl --replay-speed 1
+    python -m evaluation.run --llm azure --examples off
+
+Few-shot examples are retrieved leave-one-out by default: the example store
+minus the question being evaluated, so a golden answer never leaks into its
+own prompt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+from services import examples, llm
+from services.llm_log import ReplayClient
+from services.dataset_store import ensure_dataset, get_dataset_data
+from services.sample_data import DATASETS
+from services.sqlite_db import build_schema
+
+GOLDEN_PATH = Path(__file__).with_name("golden.json")
+
+
+def make_response(content: str, prompt_tokens: int, completion_tokens: int):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class MockClient:
+    """Stands in for AzureOpenAI and answers each golden question with its reference SQL."""
+
+    def __init__(self, answers: dict[str, str]):
+        self.answers = answers
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, model, messages, temperature, max_tokens):
+        content = self.answers.get(messages[-1]["content"], "SELECT 1")
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        return make_response(content, prompt_tokens, len(content) // 4)
+
+
+class MeteredClient:
+    """Wraps a client and accumulates call count and token usage."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.chat = SimpleNamespace(completions=self)
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def create(self, **kwargs):
+        response = self.inner.chat.completions.create(**kwargs)
+        self.calls += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        return response
+
+
+_connections = {}
+
+
+def execute_sql(db_path: str, sql: str) -> dict:
+    """Run a query in a worker process against a read-only dataset database."""
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        _connections[db_path] = conn
+    start = time.perf_counter()
+    try:
+        rows = conn.execute(sql).fetchall()
+    except sqlite3.Error as e:
+        return {"rows": None, "error": str(e), "runtime_ms": (time.perf_counter() - start) * 1000}
+    return {"rows": rows, "error": None, "runtime_ms": (time.perf_counter() - start) * 1000}
+
+
+def normalize_rows(rows: list, ordered: bool) -> list:
+    normalized = [tuple(round(v, 4) if isinstance(v, float) else v for v in row) for row in rows]
+    return normalized if ordered else sorted(normalized, key=repr)
+
+
+def results_match(generated: dict, reference: dict, reference_sql: str) -> bool:
+    if generated["error"] or reference["error"]:
+        return False
+    ordered = "order by" in reference_sql.lower()
+    return normalize_rows(generated["rows"], ordered) == normalize_rows(reference["rows"], ordered)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def evaluate(datasets: list[str], golden: dict, workers: int, examples_mode: str = "loo",
+                   mock: bool = False) -> list[dict]:
+    metered = MeteredClient(llm.get_client())
+    llm.client = metered
+    if examples_mode == "off":
+        os.environ["SQL_EXAMPLES"] = "0"
+    store = examples.get_example_index()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for dataset in datasets:
+            db_path = ensure_dataset(dataset)
+            schema = build_schema(get_dataset_data(dataset))
+
+            for case in golden.get(dataset, []):
+                if examples_mode == "loo":
+                    examples.index = store.excluding(case["question"])
+                metered.reset()
+                start = time.perf_counter()
+                try:
+                    sql, error = await llm.generate_sql(case["question"], schema, dataset), None
+                except Exception as e:
+                    sql, error = "", str(e)
+                result = {
+                    "dataset": dataset,
+                    "question": case["question"],
+                    "reference_sql": case["sql"],
+                    "generated_sql": sql,
+                    "llm_error": error,
+                    "llm_latency_ms": (time.perf_counter() - start) * 1000,
+                    "llm_calls": metered.calls,
+                    "prompt_tokens": metered.prompt_tokens,
+                    "completion_tokens": metered.completion_tokens,
+                    "pruning_error": llm.validate_sql(case["sql"], llm.prompt_schema(case["question"], schema, dataset)),
+                }
+                pending.append((
+                    result,
+                    pool.submit(execute_sql, db_path, sql or "SELECT NULL WHERE 0"),
+                    pool.submit(execute_sql, db_path, case["sql"]),
+                ))
+
+        results = []
+        for result, generated_future, reference_future in pending:
+            generated, reference = generated_future.result(), reference_future.result()
+            result["match"] = results_match(generated, reference, result["reference_sql"])
+            if mock and result["pruning_error"]:
+                result["match"] = False
+            result["execution_error"] = generated["error"]
+            result["query_runtime_ms"] = generated["runtime_ms"]
+            result["reference_runtime_ms"] = reference["runtime_ms"]
+            if reference["error"]:
+                result["reference_error"] = reference["error"]
+            results.append(result)
+    return results
+
+
+def summarize(results: list[dict]) -> list[dict]:
+    summary = []
+    for dataset in dict.fromkeys(r["dataset"] for r in results):
+        rows = [r for r in results if r["dataset"] == dataset]
+        summary.append({
+            "dataset": dataset,
+            "questions": len(rows),
+            "accuracy": sum(r["match"] for r in rows) / len(rows),
+            "query_ms_p50": percentile([r["query_runtime_ms"] for r in rows], 50),
+            "query_ms_p95": percentile([r["query_runtime_ms"] for r in rows], 95),
+            "llm_ms_p50": percentile([r["llm_latency_ms"] for r in rows], 50),
+            "llm_ms_p95": percentile([r["llm_latency_ms"] for r in rows], 95),
+            "pruning_misses": sum(bool(r["pruning_error"]) for r in rows),
+            "llm_calls": sum(r["llm_calls"] for r in rows),
+            "prompt_tokens": statistics.mean(r["prompt_tokens"] for r in rows),
+            "completion_tokens": statistics.mean(r["completion_tokens"] for r in rows),
+        })
+    return summary
+
+
+def print_report(results: list[dict], summary: list[dict]):
+    for r in results:
+        if r["pruning_error"]:
+            print(f"PRUNE [{r['dataset']}] {r['question']}\n     reference SQL on pruned schema: {r['pruning_error']}")
+        if not r["match"]:
+            reason = (r["llm_error"] or r["execution_error"] or r.get("reference_error")
+                      or (r["pruning_error"] and "pruned schema") or "result mismatch")
+            print(f"MISS [{r['dataset']}] {r['question']}\n     {reason}\n     {r['generated_sql']}")
+
+    header = f"{'dataset':<10} {'n':>3} {'acc':>6} {'pruned':>6} {'query p50/p95 ms':>18} {'llm p50/p95 ms':>18} {'calls':>5} {'prompt tok':>10} {'compl tok':>9}"
+    print(header)
+    print("-" * len(header))
+    for s in summary:
+        print(
+            f"{s['dataset']:<10} {s['questions']:>3} {s['accuracy']:>6.0%} {s['pruning_misses']:>6} "
+            f"{s['query_ms_p50']:>8.2f}/{s['query_ms_p95']:<9.2f} {s['llm_ms_p50']:>8.0f}/{s['llm_ms_p95']:<9.0f} "
+            f"{s['llm_calls']:>5} {s['prompt_tokens']:>10.0f} {s['completion_tokens']:>9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate NL→SQL accuracy and latency on the golden set")
+    parser.add_argument("--datasets", nargs="*", default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument("--llm", choices=["mock", "azure"], default="mock",
+                        help="mock answers with the reference SQL; azure calls the configured deployment")
+    parser.add_argument("--replay", help="Serve LLM responses from a recorded log (overrides --llm)")
+    parser.add_argument("--replay-speed", type=float, default=0.0,
+                        help="Replay with recorded latency divided by this factor; 0 disables delays")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--examples", choices=["loo", "off"], default="loo",
+                        help="loo retrieves few-shot examples excluding the evaluated question; off disables them")
+    parser.add_argument("--output", help="Write per-question results and the summary as JSON")
+    args = parser.parse_args()
+
+    load_dotenv()
+    golden = json.loads(GOLDEN_PATH.read_text())
+    if args.replay:
+        llm.client = ReplayClient(args.replay, args.replay_speed)
+    elif args.llm == "mock":
+        llm.client = MockClient({case["question"]: case["sql"] for cases in golden.values() for case in cases})
+
+    mock = args.llm == "mock" and not args.replay
+    results = asyncio.run(evaluate(args.datasets, golden, args.workers, args.examples, mock))
+    summary = summarize(results)
+    print_report(results, summary)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"summary": summary, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
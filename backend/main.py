@@ -1,12 +1,33 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
-from routes import data, query, visualize
+from routes import admin, ask, data, examples, jobs, query, uploads, visualize
+from services import warmup
+from services.admission import QueueFull, get_controller
+from services.jobs import shutdown as shutdown_jobs
+from services.profiling import start_profile, store_profile
+from services.script_cache import get_script_cache
 
 load_dotenv()
 
-app = FastAPI(title="Chat Your Data API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = None
+    if warmup.enabled():
+        task = asyncio.create_task(warmup.warm_up())
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+    await asyncio.to_thread(shutdown_jobs)
+
+
+app = FastAPI(title="Chat Your Data API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,11 +37,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Profile a single request when an admin sends X-Profile: cpu or memory.
+
+    The profile id is returned in X-Profile-Id; fetch it from /api/admin/profiles/{id}.
+    """
+    kind = request.headers.get("x-profile")
+    if not kind:
+        return await call_next(request)
+    if not admin.is_admin(request.headers.get("x-admin-token")):
+        return JSONResponse(status_code=403, content={"detail": "X-Profile requires a valid X-Admin-Token"})
+    try:
+        profiler = await asyncio.to_thread(start_profile, kind)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    try:
+        response = await call_next(request)
+    finally:
+        result = await asyncio.to_thread(profiler.stop)
+    response.headers["X-Profile-Id"] = store_profile(result, f"{request.method} {request.url.path}")
+    return response
+
+
 app.include_router(data.router, prefix="/api")
 app.include_router(query.router, prefix="/api")
 app.include_router(visualize.router, prefix="/api")
+app.include_router(ask.router, prefix="/api")
+app.include_router(uploads.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(examples.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok", "ready": warmup.is_ready(), "datasets": warmup.status}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: every dataset is built and indexed."""
+    if not warmup.is_ready():
+        return JSONResponse(status_code=503, content={"status": "warming", "datasets": warmup.status})
+    return {"status": "ready", "datasets": warmup.status}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Admission queue and script cache counters for this worker process."""
+    return {"admission": get_controller().metrics(), "script_cache": get_script_cache().stats()}
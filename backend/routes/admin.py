@@ -0,0 +1,66 @@
+import asyncio
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from services.profiling import DEFAULT_INTERVAL_MS, MAX_PROFILE_SECONDS, profiles, start_profile
+
+
+def is_admin(token: str | None) -> bool:
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+async def require_admin(x_admin_token: str | None = Header(default=None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and need it in X-Admin-Token."""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/admin/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: float = Query(default=10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(default=DEFAULT_INTERVAL_MS, ge=1, le=100),
+):
+    """Sample every thread's stack for a window; returns folded stacks for a flamegraph."""
+    sampler = start_profile("cpu", interval_ms)
+    await asyncio.sleep(seconds)
+    result = await asyncio.to_thread(sampler.stop)
+    return result["folded"]
+
+
+@router.post("/admin/profile/memory")
+async def profile_memory(
+    seconds: float = Query(default=10, gt=0, le=MAX_PROFILE_SECONDS),
+    limit: int = Query(default=25, ge=1, le=200),
+):
+    """Trace allocations for a window; returns the top allocation sites by size growth."""
+    tracer = await asyncio.to_thread(start_profile, "memory", limit=limit)
+    await asyncio.sleep(seconds)
+    return await asyncio.to_thread(tracer.stop)
+
+
+@router.get("/admin/profiles")
+async def list_profiles():
+    """Per-request profiles captured with the X-Profile header, newest last."""
+    return [
+        {"id": p["id"], "kind": p["kind"], "label": p["label"], "created": p["created"], "seconds": p["seconds"]}
+        for p in profiles.values()
+    ]
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Return a stored profile: folded stacks as text for CPU, allocation sites for memory."""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    if profile["kind"] == "cpu":
+        return PlainTextResponse(profile["folded"])
+    return profile
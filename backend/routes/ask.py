@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from services.admission import QueueFull, client_id, get_controller
+from services.dataset_store import execute_query, get_dataset_create_sql, query_columns
+from services.downsample import infer_column_types, reduce_result
+from services.llm import clean_code, generate_sql, generate_visualization_script, validate_sql
+from services.pipeline import check_script_columns, predict_column_types, shape_matches
+from services.script_cache import get_script_cache, shape_key
+
+router = APIRouter()
+
+DEFAULT_MAX_ROWS = 100000
+
+
+class AskRequest(BaseModel):
+    question: str
+    dataset: str
+    schema: str = ""
+    userHint: str | None = None
+    maxRows: int | None = Field(default=None, ge=1)
+
+
+class AskResponse(BaseModel):
+    sql: str
+    columns: list[str]
+    rows: list
+    truncated: bool = False
+    script: str | None = None
+    scriptSource: str | None = None
+    vizColumns: list[str] | None = None
+    vizRows: list | None = None
+    reduction: dict | None = None
+    timings: dict
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def timed(awaitable) -> tuple:
+    start = time.perf_counter()
+    return await awaitable, elapsed_ms(start)
+
+
+async def visualization_script(client: str, columns: list[str], types: list[str], rows: list, hint: str | None,
+                               reduction: dict | None = None, speculative: bool = False) -> tuple[str, bool]:
+    """Cached or newly generated script for a result shape; returns (script, cached)."""
+    script = get_script_cache().get(shape_key(columns, types, hint))
+    if script is not None:
+        return script, True
+    async with get_controller().admit(client, "visualize"):
+        script = await generate_visualization_script(
+            columns, rows, hint, reduction, types if speculative else None
+        )
+    return script, False
+
+
+@router.post("/ask", response_model=AskResponse)
+async def ask(request: AskRequest, http_request: Request):
+    """Answer a question about a stored dataset with SQL, its result and a visualization script.
+
+    The script is generated from the SQL's predicted result shape while the query
+    runs, and regenerated from the real rows only if the prediction was wrong.
+    Results above the reduction threshold are returned in full for display, plus
+    the reduced vizColumns and vizRows the script must run on.
+    """
+    started = time.perf_counter()
+    client = client_id(http_request)
+    schema = request.schema
+    if not schema:
+        try:
+            schema = await asyncio.to_thread(get_dataset_create_sql, request.dataset)
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=404, detail=f"Unknown dataset: {request.dataset}")
+
+    async with get_controller().admit(client, "query"):
+        try:
+            sql = await generate_sql(request.question, schema, request.dataset)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    timings = {"sql_ms": elapsed_ms(started)}
+
+    # The store also denies anything but reads (dataset_store.read_only); this rejects the rest early
+    error = await asyncio.to_thread(validate_sql, sql, schema)
+    if error:
+        raise HTTPException(status_code=400, detail=f"Invalid SQL: {error}")
+    try:
+        projected = await asyncio.to_thread(query_columns, request.dataset, sql)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {request.dataset}")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}")
+    predicted = predict_column_types(projected, schema)
+
+    max_rows = int(os.getenv("ASK_MAX_ROWS", DEFAULT_MAX_ROWS))
+    if request.maxRows is not None:
+        max_rows = min(request.maxRows, max_rows)
+    execution = asyncio.create_task(timed(asyncio.to_thread(execute_query, request.dataset, sql, max_rows)))
+    speculation = asyncio.create_task(timed(
+        visualization_script(client, projected, predicted, [], request.userHint, speculative=True)
+    ))
+    try:
+        (columns, rows, truncated), timings["execute_ms"] = await execution
+    except (sqlite3.Error, TimeoutError) as e:
+        speculation.cancel()
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}")
+    except BaseException:
+        speculation.cancel()
+        raise
+
+    viz_columns, viz_rows, reduction = await asyncio.to_thread(reduce_result, columns, rows)
+    viz_types = infer_column_types(viz_columns, viz_rows)
+    try:
+        (script, cached), timings["script_ms"] = await speculation
+        source = "cached" if cached else "speculative"
+    except Exception:
+        script = None
+
+    if (script is None or not shape_matches(projected, predicted, viz_columns, viz_rows)
+            or check_script_columns(script, viz_columns)):
+        try:
+            (script, cached), timings["regenerate_ms"] = await timed(
+                visualization_script(client, viz_columns, viz_types, viz_rows, request.userHint, reduction)
+            )
+        except QueueFull:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        source = "cached" if cached else "regenerated"
+    if not cached and check_script_columns(script, viz_columns) is None:
+        get_script_cache().put(shape_key(viz_columns, viz_types, request.userHint), script)
+
+    timings["total_ms"] = elapsed_ms(started)
+    return AskResponse(
+        sql=sql,
+        columns=columns,
+        rows=rows,
+        truncated=truncated,
+        script=clean_code(script),
+        scriptSource=source,
+        vizColumns=viz_columns if reduction else None,
+        vizRows=viz_rows if reduction else None,
+        reduction=reduction,
+        timings=timings,
+    )
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Query
-from services.sample_data import generate_sample_data, get_datasets
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+from services.dataset_store import current_version, get_dataset_data, get_dataset_schema, get_table_page
+from services.sample_data import DATASETS, generate_sample_delta, get_datasets
 
 router = APIRouter()
 
@@ -10,7 +13,67 @@ async def list_datasets():
     return get_datasets()
 
 
+# Plain def: FastAPI runs these in its thread pool, so a store rebuild (or waiting on
+# another worker's build lock) does not block the event loop
 @router.get("/data")
-async def get_business_data(dataset: str = Query(default="sales")):
-    """Return business data to populate the frontend SQLite database."""
-    return generate_sample_data(dataset)
+def get_business_data(
+    dataset: str = Query(default="sales"),
+    since: str | None = Query(default=None),
+    tables: str | None = Query(default=None),
+):
+    """Return business data to populate the frontend SQLite database.
+
+    `tables` restricts the response to a comma-separated list of tables. With
+    `since` set to a previously returned version, only the rows added and
+    expired since that version are returned; this is available for the
+    built-in datasets only, since uploads and builds do not change daily.
+    """
+    if dataset not in get_datasets():
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+    names = tables.split(",") if tables else None
+    if since is None:
+        try:
+            return get_dataset_data(dataset, names)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+
+    if dataset not in DATASETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Delta updates (since) are only available for the built-in datasets; fetch {dataset} without since",
+        )
+    if names is not None:
+        unknown = [t for t in names if t not in get_dataset_schema(dataset)["tables"]]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown table(s) in {dataset}: {', '.join(unknown)}")
+    try:
+        delta = generate_sample_delta(dataset, date.fromisoformat(since), date.fromisoformat(current_version()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if names is not None:
+        # Tables without changes are not in the delta at all
+        delta["tables"] = {t: data for t, data in delta["tables"].items() if t in names}
+    return delta
+
+
+@router.get("/data/{dataset}/schema")
+def get_schema(dataset: str):
+    """Return column names, types and row counts per table so clients can load tables on demand."""
+    try:
+        return get_dataset_schema(dataset)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+
+
+@router.get("/data/{dataset}/{table}")
+def get_table(
+    dataset: str,
+    table: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=1000, ge=1, le=50000),
+):
+    """Return a range of rows from a single table."""
+    try:
+        return get_table_page(dataset, table, offset, limit)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
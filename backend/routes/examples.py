@@ -0,0 +1,47 @@
+import asyncio
+import sqlite3
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from routes.admin import require_admin
+from services.dataset_store import execute_query, get_dataset_create_sql
+from services.examples import get_example_index
+from services.llm import validate_sql
+from services.sample_data import get_datasets
+
+router = APIRouter()
+
+
+class ExampleRequest(BaseModel):
+    question: str
+    sql: str
+    dataset: str
+
+
+@router.get("/examples")
+async def search_examples(question: str, dataset: str | None = None, k: int = Query(default=3, ge=1, le=20)):
+    """Return the stored examples most similar to a question, as used for few-shot prompting."""
+    results = await asyncio.to_thread(get_example_index().search, question, dataset, k, 0.0)
+    return [{"score": round(score, 4), **example} for score, example in results]
+
+
+@router.post("/examples", dependencies=[Depends(require_admin)])
+async def add_example(request: ExampleRequest):
+    """Store a validated question/SQL pair for a dataset as a few-shot example.
+
+    Examples are pasted into future prompts, so adding one needs the admin token,
+    and the SQL must run on the dataset and return rows.
+    """
+    if request.dataset not in get_datasets():
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {request.dataset}")
+    schema = await asyncio.to_thread(get_dataset_create_sql, request.dataset)
+    error = validate_sql(request.sql, schema)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    try:
+        _, rows, _ = await asyncio.to_thread(execute_query, request.dataset, request.sql, 1)
+    except (sqlite3.Error, TimeoutError) as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}")
+    if not rows:
+        raise HTTPException(status_code=400, detail="Query returns no rows")
+    return await asyncio.to_thread(get_example_index().add, request.question, request.sql, request.dataset)
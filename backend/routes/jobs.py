@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from routes.admin import require_admin
+from services.jobs import MAX_HISTORY_DAYS, cancel_job, get_job, list_jobs, submit_job, watch_job
+
+router = APIRouter()
+
+
+class JobRequest(BaseModel):
+    kind: str
+    dataset: str | None = None
+    target: str | None = None
+    history_days: int | None = Field(default=None, ge=1, le=MAX_HISTORY_DAYS)
+    upload_id: str | None = None
+
+
+# Plain def: job state is kept in files under the store directory, so these run in
+# FastAPI's thread pool instead of blocking the event loop on file access
+@router.post("/jobs", status_code=202, dependencies=[Depends(require_admin)])
+def create_job(request: JobRequest):
+    """Queue a dataset build or upload ingest and return the job to poll or watch."""
+    try:
+        return submit_job(request.kind, request.model_dump(exclude={"kind"}, exclude_none=True))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/jobs")
+def get_jobs():
+    """Return recent jobs, oldest first."""
+    return list_jobs()
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Return a job's status, rows per table, fraction done and ETA."""
+    try:
+        return get_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream the job's state as server-sent events until it finishes."""
+    try:
+        await asyncio.to_thread(get_job, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    async def stream():
+        async for snap in watch_job(job_id):
+            yield f"event: {snap['status']}\ndata: {json.dumps(snap)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.delete("/jobs/{job_id}", dependencies=[Depends(require_admin)])
+def delete_job(job_id: str):
+    """Cancel a queued or running job."""
+    try:
+        return cancel_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
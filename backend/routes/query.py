@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from services.admission import client_id, get_controller
+from services.dataset_store import get_dataset_create_sql
 from services.llm import generate_sql
 
 router = APIRouter()
@@ -7,7 +11,8 @@ router = APIRouter()
 
 class QueryRequest(BaseModel):
     question: str
-    schema: str
+    schema: str = ""
+    dataset: str | None = None
 
 
 class QueryResponse(BaseModel):
@@ -15,10 +20,24 @@ class QueryResponse(BaseModel):
 
 
 @router.post("/query", response_model=QueryResponse)
-async def convert_to_sql(request: QueryRequest):
-    """Convert natural language question to SQL query."""
-    try:
-        sql = await generate_sql(request.question, request.schema)
-        return QueryResponse(sql=sql)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def convert_to_sql(request: QueryRequest, http_request: Request):
+    """Convert natural language question to SQL query.
+
+    Without a schema, the schema of `dataset` is read from the dataset store, so
+    datasets too large to load in the browser can still be queried.
+    """
+    schema = request.schema
+    if not schema:
+        if not request.dataset:
+            raise HTTPException(status_code=400, detail="Either schema or dataset is required")
+        try:
+            schema = await asyncio.to_thread(get_dataset_create_sql, request.dataset)
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=404, detail=f"Unknown dataset: {request.dataset}")
+
+    async with get_controller().admit(client_id(http_request), "query"):
+        try:
+            sql = await generate_sql(request.question, schema, request.dataset)
+            return QueryResponse(sql=sql)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
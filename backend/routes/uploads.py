@@ -0,0 +1,91 @@
+import asyncio
+import csv
+import sqlite3
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel
+from routes.admin import require_admin
+from services.ingest import (
+    create_upload, delete_upload, get_upload, ingest_upload, max_upload_bytes, open_chunk, write_chunk,
+)
+
+router = APIRouter()
+
+# Request body parts are collected up to this size before each file write
+WRITE_BYTES = 1024 * 1024
+
+
+class UploadRequest(BaseModel):
+    dataset: str
+    format: str = "csv"
+    table: str | None = None
+    description: str | None = None
+
+
+@router.post("/uploads", dependencies=[Depends(require_admin)])
+async def start_upload(request: UploadRequest):
+    """Start a chunked upload of a CSV or Parquet file into a table of an uploaded dataset."""
+    try:
+        return create_upload(request.dataset, request.format, request.table, request.description)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """Return the upload session, including the bytes received so far."""
+    try:
+        return get_upload(upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.put("/uploads/{upload_id}", dependencies=[Depends(require_admin)])
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(ge=0)):
+    """Append the request body, the chunk of the file starting at `offset`, to the upload.
+
+    Returns 413 once the upload would exceed UPLOAD_MAX_MB; the chunk is discarded.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and offset + int(length) > max_upload_bytes():
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_upload_bytes() // (1024 * 1024)} MB limit")
+    try:
+        f = await asyncio.to_thread(open_chunk, upload_id, offset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        buffer = bytearray()
+        async for part in request.stream():
+            buffer += part
+            if len(buffer) >= WRITE_BYTES:
+                await asyncio.to_thread(write_chunk, f, bytes(buffer), offset)
+                buffer.clear()
+        await asyncio.to_thread(write_chunk, f, bytes(buffer), offset)
+    except OverflowError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await asyncio.to_thread(f.close)
+    return await asyncio.to_thread(get_upload, upload_id)
+
+
+@router.post("/uploads/{upload_id}/complete", dependencies=[Depends(require_admin)])
+async def complete_upload(upload_id: str):
+    """Parse the uploaded file into the dataset store; the dataset is then listed and queryable."""
+    try:
+        return await asyncio.to_thread(ingest_upload, upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except (ValueError, UnicodeDecodeError, csv.Error, sqlite3.Error) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/uploads/{upload_id}", dependencies=[Depends(require_admin)])
+async def cancel_upload(upload_id: str):
+    """Discard an unfinished upload."""
+    try:
+        delete_upload(upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"status": "deleted"}
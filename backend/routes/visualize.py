@@ -1,6 +1,11 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from services.llm import generate_visualization, generate_visualization_script
+from services.admission import client_id, get_controller
+from services.downsample import infer_column_types, reduce_result
+from services.llm import clean_code, generate_visualization, generate_visualization_script, validate_script
+from services.script_cache import get_script_cache, shape_key
 
 router = APIRouter()
 
@@ -17,31 +22,78 @@ class VisualizeResponse(BaseModel):
 
 class ScriptResponse(BaseModel):
     script: str
+    columns: list[str] | None = None
+    rows: list | None = None
+    reduction: dict | None = None
+    cached: bool = False
+
+
+class ReduceRequest(BaseModel):
+    columns: list[str]
+    rows: list
+
+
+class ReduceResponse(BaseModel):
+    columns: list[str]
+    rows: list
+    reduction: dict | None = None
 
 
 @router.post("/visualize", response_model=VisualizeResponse)
-async def create_visualization(request: VisualizeRequest):
+async def create_visualization(request: VisualizeRequest, http_request: Request):
     """Generate Plotly visualization code from query results."""
-    try:
-        plotly_code = await generate_visualization(
-            request.columns,
-            request.sampleData,
-            request.userHint
-        )
-        return VisualizeResponse(plotlyCode=plotly_code)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async with get_controller().admit(client_id(http_request), "visualize"):
+        try:
+            plotly_code = await generate_visualization(
+                request.columns,
+                request.sampleData,
+                request.userHint
+            )
+            return VisualizeResponse(plotlyCode=plotly_code)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/visualize-script", response_model=ScriptResponse)
-async def create_visualization_script(request: VisualizeRequest):
-    """Generate JavaScript code to create Plotly visualization from query results."""
+async def create_visualization_script(request: VisualizeRequest, http_request: Request):
+    """Generate JavaScript code to create Plotly visualization from query results.
+
+    Large results are reduced first; the reduced columns and rows are returned
+    with the script, which must run on them rather than on the full result.
+    Scripts that pass validation are cached by result shape and hint; only
+    cache misses take an admission slot.
+    """
     try:
-        script = await generate_visualization_script(
-            request.columns,
-            request.sampleData,
-            request.userHint
-        )
-        return ScriptResponse(script=script)
+        # Reducing 100k rows takes about half a second; keep it off the event loop
+        columns, rows, reduction = await asyncio.to_thread(reduce_result, request.columns, request.sampleData)
+        cache = get_script_cache()
+        key = shape_key(columns, infer_column_types(columns, rows), request.userHint)
+        script = cache.get(key)
+        cached = script is not None
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    if not cached:
+        async with get_controller().admit(client_id(http_request), "visualize"):
+            try:
+                script = await generate_visualization_script(
+                    columns,
+                    rows,
+                    request.userHint,
+                    reduction
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+        if validate_script(clean_code(script)) is None:
+            cache.put(key, script)
+
+    if reduction:
+        return ScriptResponse(script=script, columns=columns, rows=rows, reduction=reduction, cached=cached)
+    return ScriptResponse(script=script, cached=cached)
+
+
+@router.post("/reduce", response_model=ReduceResponse)
+async def reduce_rows(request: ReduceRequest):
+    """Apply the same reduction as /visualize-script, for re-running a saved script on new results."""
+    columns, rows, reduction = await asyncio.to_thread(reduce_result, request.columns, request.rows)
+    return ReduceResponse(columns=columns, rows=rows, reduction=reduction)
@@ -0,0 +1,160 @@
+"""Admission control for the LLM-backed routes.
+
+At most ADMISSION_SLOTS requests call the LLM at once, and each client holds at
+most ADMISSION_PER_CLIENT of those slots. Requests beyond that wait in a bounded
+queue. When a slot frees up, the next request is picked by:
+
+1. priority: interactive query generation ahead of visualization,
+2. fair share: the client with the fewest requests in flight,
+3. arrival order.
+
+When the queue, or a client's share of it, is full, the request is rejected at
+once with QueueFull (HTTP 429) instead of adding to everyone's latency.
+"""
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+PRIORITIES = {"query": 0, "visualize": 1}
+WAIT_SAMPLES = 1000
+
+controller = None
+
+
+class QueueFull(Exception):
+    """Raised when a request cannot be queued; maps to HTTP 429."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Waiter:
+    def __init__(self, client: str, kind: str, seq: int):
+        self.client = client
+        self.kind = kind
+        self.seq = seq
+        self.admitted = False
+        self.future = asyncio.get_running_loop().create_future()
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class AdmissionController:
+    """Global and per-client concurrency limits with a bounded priority queue."""
+
+    def __init__(self, slots: int, per_client: int, queue_size: int, client_queue_size: int):
+        self.slots = slots
+        self.per_client = per_client
+        self.queue_size = queue_size
+        self.client_queue_size = client_queue_size
+        self.active = 0
+        self.in_flight = {}
+        self.waiters = []
+        self.seq = itertools.count()
+        self.waits = {kind: deque(maxlen=WAIT_SAMPLES) for kind in PRIORITIES}
+        self.admitted = {kind: 0 for kind in PRIORITIES}
+        self.rejected = {kind: 0 for kind in PRIORITIES}
+
+    def release(self, client: str):
+        self.active -= 1
+        self.in_flight[client] -= 1
+        if not self.in_flight[client]:
+            del self.in_flight[client]
+        self.dispatch()
+
+    def dispatch(self):
+        """Hand free slots to queued requests in priority, fair-share, arrival order."""
+        # A waiter cancelled in this loop tick has not removed itself yet; it must not take a slot
+        self.waiters = [w for w in self.waiters if not w.future.done()]
+        while self.active < self.slots:
+            eligible = [w for w in self.waiters if self.in_flight.get(w.client, 0) < self.per_client]
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: (PRIORITIES[w.kind], self.in_flight.get(w.client, 0), w.seq))
+            self.waiters.remove(waiter)
+            self.active += 1
+            self.in_flight[waiter.client] = self.in_flight.get(waiter.client, 0) + 1
+            waiter.admitted = True
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, client: str, kind: str):
+        """Hold a slot for the duration of the block, queueing or raising QueueFull if none is free."""
+        start = time.perf_counter()
+        queued = sum(1 for w in self.waiters if w.client == client)
+        waiter = Waiter(client, kind, next(self.seq))
+        self.waiters.append(waiter)
+        # Queued requests of clients at their limit must not hold back other clients' requests
+        self.dispatch()
+        if not waiter.future.done():
+            if len(self.waiters) > self.queue_size or queued >= self.client_queue_size:
+                self.waiters.remove(waiter)
+                self.rejected[kind] += 1
+                raise QueueFull(f"Too many pending requests ({len(self.waiters)} queued)")
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.admitted:
+                    self.release(client)
+                elif waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                raise
+        # dispatch() already took the slot; only record the admission
+        self.admitted[kind] += 1
+        self.waits[kind].append((time.perf_counter() - start) * 1000)
+
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    def metrics(self) -> dict:
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "clients_in_flight": len(self.in_flight),
+            "routes": {
+                kind: {
+                    "admitted": self.admitted[kind],
+                    "rejected": self.rejected[kind],
+                    "queue_wait_p50_ms": percentile(list(self.waits[kind]), 0.5),
+                    "queue_wait_p95_ms": percentile(list(self.waits[kind]), 0.95),
+                }
+                for kind in PRIORITIES
+            },
+        }
+
+
+def get_controller() -> AdmissionController:
+    global controller
+    if controller is None:
+        controller = AdmissionController(
+            int(os.getenv("ADMISSION_SLOTS", "8")),
+            int(os.getenv("ADMISSION_PER_CLIENT", "2")),
+            int(os.getenv("ADMISSION_QUEUE_SIZE", "32")),
+            int(os.getenv("ADMISSION_CLIENT_QUEUE_SIZE", "8")),
+        )
+    return controller
+
+
+def client_id(request) -> str:
+    """Identify the caller by peer address.
+
+    The X-Client-Id header is used only with ADMISSION_TRUST_CLIENT_ID=1, for a
+    gateway in front of the app that sets it; otherwise a client could rotate ids
+    to escape its per-client limit.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if os.getenv("ADMISSION_TRUST_CLIENT_ID") == "1":
+        return request.headers.get("x-client-id") or peer
+    return peer
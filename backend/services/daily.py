@@ -0,0 +1,37 @@
+"""Helpers for generating time-series rows one day at a time.
+
+Every day's rows come from their own RNG stream seeded by (dataset, date), and
+row ids are derived from the day number, so the rows for a given date are
+identical no matter which day the dataset is generated on.
+"""
+import random
+from datetime import date, timedelta
+
+# Day numbers (and therefore row ids) count from this date
+EPOCH = date(2020, 1, 1)
+# Ids are day_number * ID_STRIDE + n, so at most ID_STRIDE - 1 rows per day and table
+ID_STRIDE = 100
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def day_rng(dataset: str, day: date) -> random.Random:
+    """Independent, reproducible RNG stream for one dataset and day."""
+    return random.Random(f"{dataset}:{day.isoformat()}")
+
+
+def history_window(as_of: date, days: int) -> list[date]:
+    """The `days` dates ending on as_of (inclusive), oldest first."""
+    return [as_of - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+def first_id(day: date) -> int:
+    """Smallest row id a day can produce."""
+    return day_number(day) * ID_STRIDE
+
+
+def daily_count(rng: random.Random, mean: float, trials: int = 4) -> int:
+    """Binomial row count per day with the given mean."""
+    return sum(rng.random() < mean / trials for _ in range(trials))
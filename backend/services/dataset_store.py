@@ -0,0 +1,368 @@
+"""Dataset store shared by all worker processes.
+
+Each dataset is materialized once into a SQLite file under DATASET_STORE_DIR.
+Workers open the file read-only with memory-mapped I/O, so every process serves
+/api/data and query execution from the same page-cache pages instead of holding
+its own copy of the generated rows. A dataset is rebuilt into a temporary file
+and swapped in with os.replace(); connections notice the new file on their next
+use and reopen it, while in-flight reads finish against the old one.
+
+Uploaded datasets (see ingest.py) and scaled builds of generated datasets live
+in the same directory and are listed in registry.json. They are kept as built
+instead of being regenerated daily.
+"""
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from .sample_data import generate_sample_data, get_datasets, get_summary_tables
+from .sqlite_db import create_database
+from .value_index import collect_values, index_values
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not coordinated across processes
+    fcntl = None
+
+MMAP_SIZE = 256 * 1024 * 1024
+QUERY_TIMEOUT_SECONDS = 30
+# SQLite VM instructions between query deadline checks
+PROGRESS_STEPS = 10000
+
+_local = threading.local()
+_value_indexes = {}
+_registry = (None, {})
+
+
+def store_dir() -> str:
+    path = os.getenv("DATASET_STORE_DIR") or os.path.join(tempfile.gettempdir(), "chat-your-data-store")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def dataset_path(dataset: str) -> str:
+    """Store file of a dataset; names that are not plain identifiers are rejected as unknown."""
+    if not re.fullmatch(r"\w+", dataset):
+        raise KeyError(f"Unknown dataset: {dataset}")
+    return os.path.join(store_dir(), f"{dataset}.db")
+
+
+def current_version() -> str:
+    """Generated datasets are anchored on the current date, so the date is their version."""
+    return date.today().isoformat()
+
+
+def read_meta(conn: sqlite3.Connection) -> dict:
+    return {key: value for key, value in conn.execute("SELECT key, value FROM _meta")}
+
+
+def stored_version(path: str) -> str | None:
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return read_meta(conn).get("version")
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def write_meta(conn: sqlite3.Connection, version: str, tables: list[str], values: list[tuple[str, str, str]]):
+    """(Re)write the _meta and _value_index tables of a store file."""
+    conn.execute("CREATE TABLE IF NOT EXISTS _meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT OR REPLACE INTO _meta VALUES (?, ?)", [
+        ("version", version),
+        ("tables", json.dumps(tables)),
+    ])
+    conn.execute("CREATE TABLE IF NOT EXISTS _value_index (table_name TEXT, column_name TEXT, value TEXT)")
+    conn.executemany("INSERT INTO _value_index VALUES (?, ?, ?)", values)
+    conn.commit()
+
+
+def temp_path(dataset: str) -> str:
+    path = f"{dataset_path(dataset)}.{os.getpid()}.tmp"
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def write_dataset(dataset: str, data: dict, version: str) -> str:
+    """Materialize a dataset into a temporary file and atomically swap it into place."""
+    path = dataset_path(dataset)
+    tmp_path = temp_path(dataset)
+
+    conn = create_database(data, tmp_path)
+    try:
+        write_meta(conn, version, list(data["tables"]), collect_values(data))
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def registered_datasets() -> dict:
+    """Registry of uploaded and built datasets, re-read only when registry.json changes."""
+    global _registry
+    path = os.path.join(store_dir(), "registry.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _registry[0] != mtime:
+        with open(path) as f:
+            _registry = (mtime, json.load(f))
+    return _registry[1]
+
+
+def register_dataset(dataset: str, info: dict):
+    """Add or update a dataset in the registry."""
+    path = os.path.join(store_dir(), "registry.json")
+    with open(f"{path}.lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            registry = dict(registered_datasets())
+            registry[dataset] = info
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(registry, f, indent=2)
+            os.replace(tmp_path, path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def dataset_lock(dataset: str):
+    """Serialize writers of a dataset's store file across processes."""
+    with open(f"{dataset_path(dataset)}.lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def ensure_dataset(dataset: str, force: bool = False, progress=None) -> str:
+    """Return the store path for a dataset, building it if missing or stale.
+
+    Builds are serialized across processes with a lock file, and the version is
+    re-checked after acquiring it so only the first worker pays the build cost.
+    """
+    path = dataset_path(dataset)
+    if dataset in registered_datasets():
+        if not os.path.exists(path):
+            raise KeyError(f"Dataset {dataset} is missing from the store")
+        return path
+    if dataset not in get_datasets():
+        raise KeyError(f"Unknown dataset: {dataset}")
+
+    version = current_version()
+    if not force and stored_version(path) == version:
+        return path
+
+    with dataset_lock(dataset):
+        if force or stored_version(path) != version:
+            data = generate_sample_data(dataset, date.fromisoformat(version), progress=progress)
+            write_dataset(dataset, data, version)
+    return path
+
+
+def build_dataset(dataset: str, target: str | None = None, history_days: int | None = None, progress=None) -> str:
+    """Rebuild a generated dataset now, or build it with a different history under a new name.
+
+    A build under `target` is registered, so it is kept as built instead of
+    being regenerated daily.
+    """
+    if target is None or target == dataset:
+        if history_days is not None:
+            raise ValueError("Building with a different history needs a target name")
+        return ensure_dataset(dataset, force=True, progress=progress)
+
+    existing = get_datasets().get(target)
+    if existing is not None and existing.get("source") != "build":
+        raise ValueError(f"Dataset {target} already exists")
+    version = current_version()
+    with dataset_lock(target):
+        data = generate_sample_data(dataset, date.fromisoformat(version), history_days, progress)
+        write_dataset(target, data, version)
+        days = f"{history_days} days of history" if history_days else "default history"
+        register_dataset(target, {
+            "name": target,
+            "description": f"{get_datasets()[dataset]['description']} ({days})",
+            "source": "build",
+            "base": dataset,
+            "history_days": history_days,
+            "tables": list(data["tables"]),
+            "version": version,
+        })
+    return dataset_path(target)
+
+
+def file_identity(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def connect(dataset: str) -> sqlite3.Connection:
+    """Return this thread's read-only connection to a dataset, reopening it after a swap."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    path = dataset_path(dataset)
+    cached = connections.get(dataset)
+    if cached is not None:
+        identity, version, conn = cached
+        current = version == current_version() or dataset in registered_datasets()
+        if current and os.path.exists(path) and file_identity(path) == identity:
+            return conn
+        conn.close()
+
+    ensure_dataset(dataset)
+    identity = file_identity(path)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    connections[dataset] = (identity, read_meta(conn)["version"], conn)
+    return conn
+
+
+def table_names(conn: sqlite3.Connection) -> list[str]:
+    return json.loads(read_meta(conn)["tables"])
+
+
+def get_dataset_data(dataset: str = "sales", tables: list[str] | None = None) -> dict:
+    """Read tables of a dataset (all by default) from the store in the /api/data response shape."""
+    conn = connect(dataset)
+    names = table_names(conn)
+    if tables is not None:
+        unknown = [t for t in tables if t not in names]
+        if unknown:
+            raise KeyError(f"Unknown table(s) in {dataset}: {', '.join(unknown)}")
+        names = [t for t in names if t in tables]
+
+    data = {}
+    for table in names:
+        cursor = conn.execute(f"SELECT * FROM {table}")
+        data[table] = {
+            "columns": [d[0] for d in cursor.description],
+            "rows": [list(row) for row in cursor],
+        }
+    return {"version": read_meta(conn)["version"], "tables": data}
+
+
+def get_dataset_schema(dataset: str) -> dict:
+    """Column names, types, row counts and summary table descriptions per table, without any rows."""
+    conn = connect(dataset)
+    summaries = get_summary_tables()
+    tables = {}
+    for table in table_names(conn):
+        columns = [{"name": row[1], "type": row[2]} for row in conn.execute(f"PRAGMA table_info({table})")]
+        row_count = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+        tables[table] = {"columns": columns, "row_count": row_count}
+        if table in summaries:
+            tables[table]["description"] = summaries[table]
+    return {"version": read_meta(conn)["version"], "tables": tables}
+
+
+def get_dataset_create_sql(dataset: str) -> str:
+    """CREATE TABLE statements of a dataset, in the schema format the frontend sends to /api/query."""
+    conn = connect(dataset)
+    statements = [
+        conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+        for table in table_names(conn)
+    ]
+    return ";\n".join(statements) + ";"
+
+
+def get_table_page(dataset: str, table: str, offset: int = 0, limit: int = 1000) -> dict:
+    """Read a range of rows from one table.
+
+    Store tables are written once in insertion order, so rowids run 1..n without
+    gaps and a range maps to a rowid seek rather than an OFFSET scan.
+    """
+    conn = connect(dataset)
+    if table not in table_names(conn):
+        raise KeyError(f"Unknown table in {dataset}: {table}")
+
+    total = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    cursor = conn.execute(
+        f"SELECT * FROM {table} WHERE rowid > ? AND rowid <= ? ORDER BY rowid",
+        (offset, offset + limit),
+    )
+    rows = [list(row) for row in cursor]
+    next_offset = offset + limit if offset + limit < total else None
+    return {
+        "version": read_meta(conn)["version"],
+        "columns": [d[0] for d in cursor.description],
+        "rows": rows,
+        "offset": offset,
+        "total": total,
+        "next_offset": next_offset,
+    }
+
+
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+
+def read_only(action: int, *args) -> int:
+    """Authorizer for client queries: reads only, no PRAGMA, ATTACH or writes."""
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def query_columns(dataset: str, sql: str) -> list[str]:
+    """Column names a query returns, read from its prepared statement without running it."""
+    conn = connect(dataset)
+    conn.set_authorizer(read_only)
+    try:
+        cursor = conn.execute(f"SELECT * FROM ({sql.strip().rstrip(';')}) LIMIT 0")
+    finally:
+        conn.set_authorizer(None)
+    return [d[0] for d in cursor.description]
+
+
+def execute_query(dataset: str, sql: str, max_rows: int | None = None,
+                  timeout: float = QUERY_TIMEOUT_SECONDS) -> tuple[list[str], list, bool]:
+    """Run a read-only query against the store; returns (columns, rows, truncated).
+
+    Statements other than plain reads are denied by the authorizer. Raises TimeoutError if the query runs longer than `timeout` seconds.
+    """
+    conn = connect(dataset)
+    deadline = time.monotonic() + timeout
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+    conn.set_authorizer(read_only)
+    try:
+        cursor = conn.execute(sql)
+        rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows + 1)
+    except sqlite3.OperationalError as e:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Query exceeded {timeout:g}s") from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+        conn.set_authorizer(None)
+
+    truncated = max_rows is not None and len(rows) > max_rows
+    return [d[0] for d in cursor.description], [list(row) for row in rows[:max_rows]], truncated
+
+
+def get_value_index(dataset: str) -> dict:
+    """Return the value index collected when the dataset was built."""
+    conn = connect(dataset)
+    identity = _local.connections[dataset][0]
+    cached = _value_indexes.get(dataset)
+    if cached is None or cached[0] != identity:
+        values = conn.execute("SELECT table_name, column_name, value FROM _value_index").fetchall()
+        cached = (identity, index_values(values))
+        _value_indexes[dataset] = cached
+    return cached[1]
@@ -0,0 +1,220 @@
+"""Data reduction for plotting large query results.
+
+Results above REDUCE_THRESHOLD rows are reduced before a visualization script
+runs on them, picking a method from the column types:
+
+- lttb: a date column with a numeric y is downsampled with
+  Largest-Triangle-Three-Buckets, per series when a low-cardinality category
+  column is present. Columns are unchanged.
+- top_n: a high-cardinality category with numeric columns keeps the TOP_N
+  categories by the first numeric column and sums the rest into "Other".
+- grid: two or more numeric columns (scatter) keep one row per cell of a
+  square grid. Columns are unchanged.
+- histogram: a single numeric column becomes bin_start/bin_end/count rows.
+- counts: only categorical columns become value/count rows for the first one.
+
+Column types are inferred from a sample, and SQLite columns can mix types, so
+values that do not match their column's type are skipped. If nothing is left
+to reduce, the result falls back to counts.
+"""
+import math
+import re
+from datetime import datetime
+
+REDUCE_THRESHOLD = 5000
+MAX_POINTS = 2000
+MAX_SERIES = 20
+TOP_N = 20
+HISTOGRAM_BINS = 50
+TYPE_SAMPLE_SIZE = 200
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$")
+
+
+def infer_column_types(columns: list[str], rows: list) -> list[str]:
+    """Classify each column as "number", "date" or "category" from a sample of non-null values."""
+    types = []
+    for i in range(len(columns)):
+        values = [row[i] for row in rows[:TYPE_SAMPLE_SIZE] if row[i] is not None]
+        if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            types.append("number")
+        elif values and all(isinstance(v, str) and DATE_PATTERN.match(v) for v in values):
+            types.append("date")
+        else:
+            types.append("category")
+    return types
+
+
+def number(value) -> float | None:
+    """A numeric value as float, or None for nulls and values of other types."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def timestamp(value) -> float | None:
+    """An ISO date value as a POSIX timestamp, or None for nulls, other types and invalid dates."""
+    if isinstance(value, str) and DATE_PATTERN.match(value):
+        try:
+            return datetime.fromisoformat(value.replace(" ", "T")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def lttb_indices(xs: list[float], ys: list[float], threshold: int) -> list[int]:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the visual shape."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        next_start = end if end < n else n - 1
+        avg_x = sum(xs[next_start:next_end]) / max(1, next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / max(1, next_end - next_start)
+
+        best, best_area = start, -1.0
+        for i in range(start, min(end, n - 1)):
+            area = abs((xs[a] - avg_x) * (ys[i] - ys[a]) - (xs[a] - xs[i]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def reduce_lttb(rows: list, x: int, y: int, series: int | None, max_points: int) -> tuple[list, dict]:
+    groups = {}
+    for row in rows:
+        point = (timestamp(row[x]), number(row[y]))
+        if None not in point:
+            groups.setdefault(row[series] if series is not None else None, []).append((point, row))
+
+    per_series = max(3, max_points // len(groups)) if groups else max_points
+    reduced = []
+    for points in groups.values():
+        points.sort(key=lambda p: p[0][0])
+        indices = lttb_indices([p[0][0] for p in points], [p[0][1] for p in points], per_series)
+        reduced.extend(points[i] for i in indices)
+    reduced.sort(key=lambda p: p[0][0])
+    return [row for _, row in reduced], {"points_per_series": per_series, "series": len(groups)}
+
+
+def reduce_top_n(columns: list[str], rows: list, category: int, numeric: list[int]) -> tuple[list[str], list, dict]:
+    totals = {}
+    for row in rows:
+        sums = totals.setdefault(row[category], [0.0] * len(numeric))
+        for j, i in enumerate(numeric):
+            sums[j] += number(row[i]) or 0
+    ranked = sorted(totals.items(), key=lambda item: -item[1][0])
+    reduced = [[key, *sums] for key, sums in ranked[:TOP_N - 1]]
+    rest = ranked[TOP_N - 1:]
+    if rest:
+        reduced.append(["Other", *(sum(sums[j] for _, sums in rest) for j in range(len(numeric)))])
+    return [columns[category], *(columns[i] for i in numeric)], reduced, {"top_n": TOP_N, "other_categories": len(rest)}
+
+
+def reduce_grid(rows: list, x: int, y: int, max_points: int) -> tuple[list, dict]:
+    points = [(number(r[x]), number(r[y]), r) for r in rows]
+    points = [p for p in points if p[0] is not None and p[1] is not None]
+    bins = max(1, int(math.sqrt(max_points)))
+    if not points:
+        return [], {"bins_per_axis": bins}
+    x_min, x_max = min(p[0] for p in points), max(p[0] for p in points)
+    y_min, y_max = min(p[1] for p in points), max(p[1] for p in points)
+    x_step = (x_max - x_min) / bins or 1
+    y_step = (y_max - y_min) / bins or 1
+
+    cells = {}
+    for px, py, row in points:
+        cell = (min(bins - 1, int((px - x_min) / x_step)), min(bins - 1, int((py - y_min) / y_step)))
+        cells.setdefault(cell, row)
+    return list(cells.values()), {"bins_per_axis": bins}
+
+
+def reduce_histogram(columns: list[str], rows: list, col: int) -> tuple[list[str], list, dict]:
+    values = [v for v in (number(row[col]) for row in rows) if v is not None]
+    if not values:
+        return [f"{columns[col]}_bin_start", f"{columns[col]}_bin_end", "count"], [], {"bins": HISTOGRAM_BINS}
+    low, high = min(values), max(values)
+    width = (high - low) / HISTOGRAM_BINS or 1
+    counts = [0] * HISTOGRAM_BINS
+    for v in values:
+        counts[min(HISTOGRAM_BINS - 1, int((v - low) / width))] += 1
+    reduced = [[low + b * width, low + (b + 1) * width, count] for b, count in enumerate(counts)]
+    name = columns[col]
+    return [f"{name}_bin_start", f"{name}_bin_end", "count"], reduced, {"bins": HISTOGRAM_BINS}
+
+
+def reduce_counts(columns: list[str], rows: list, col: int) -> tuple[list[str], list, dict]:
+    counts = {}
+    for row in rows:
+        counts[row[col]] = counts.get(row[col], 0) + 1
+    ranked = sorted(counts.items(), key=lambda item: -item[1])
+    reduced = [list(item) for item in ranked[:TOP_N - 1]]
+    if len(ranked) >= TOP_N:
+        reduced.append(["Other", sum(c for _, c in ranked[TOP_N - 1:])])
+    return [columns[col], "count"], reduced, {"top_n": TOP_N}
+
+
+def reduce_result(columns: list[str], rows: list, max_points: int = MAX_POINTS) -> tuple[list[str], list, dict | None]:
+    """Reduce a large result for plotting; returns (columns, rows, reduction) with reduction None if untouched."""
+    if len(rows) <= REDUCE_THRESHOLD or not columns:
+        return columns, rows, None
+
+    original_columns = columns
+    types = infer_column_types(columns, rows)
+    numeric = [i for i, t in enumerate(types) if t == "number"]
+    dates = [i for i, t in enumerate(types) if t == "date"]
+    categories = [i for i, t in enumerate(types) if t == "category"]
+    cardinality = {i: len({row[i] for row in rows}) for i in categories}
+
+    if dates and numeric:
+        method = "lttb"
+        series = next((i for i in categories if cardinality[i] <= MAX_SERIES), None)
+        reduced, params = reduce_lttb(rows, dates[0], numeric[0], series, max_points)
+        params.update({"x": columns[dates[0]], "y": columns[numeric[0]],
+                       "series_column": columns[series] if series is not None else None})
+    elif categories and numeric and cardinality[categories[0]] > TOP_N:
+        method = "top_n"
+        columns, reduced, params = reduce_top_n(columns, rows, categories[0], numeric)
+    elif len(numeric) >= 2:
+        method = "grid"
+        reduced, params = reduce_grid(rows, numeric[0], numeric[1], max_points)
+        params.update({"x": columns[numeric[0]], "y": columns[numeric[1]]})
+    elif numeric:
+        method = "histogram"
+        columns, reduced, params = reduce_histogram(columns, rows, numeric[0])
+    else:
+        method = "counts"
+        columns, reduced, params = reduce_counts(columns, rows, 0)
+
+    if not reduced:
+        # The sampled types did not hold for the rest of the result
+        method = "counts"
+        columns, reduced, params = reduce_counts(original_columns, rows, 0)
+
+    reduction = {"method": method, "original_rows": len(rows), "reduced_rows": len(reduced), **params}
+    return columns, reduced, reduction
+
+
+def describe_reduction(reduction: dict) -> str:
+    """One-line explanation of a reduction for the visualization prompt."""
+    method = reduction["method"]
+    total = reduction["original_rows"]
+    if method == "lttb":
+        return f"rows are a shape-preserving downsample (LTTB) of {total} rows ordered by {reduction['x']}"
+    if method == "top_n":
+        return f"rows are totals for the top {reduction['top_n'] - 1} categories by the first numeric column plus an 'Other' row, aggregated from {total} rows"
+    if method == "grid":
+        return f"rows are one representative point per grid cell of {reduction['x']} vs {reduction['y']}, sampled from {total} rows"
+    if method == "histogram":
+        return f"rows are {reduction['bins']} pre-computed histogram bins (start, end, count) over {total} values; plot them as bars"
+    return f"rows are pre-computed value counts over {total} rows"
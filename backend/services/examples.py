@@ -0,0 +1,207 @@
+"""Validated (question, SQL, dataset) pairs retrieved as few-shot examples.
+
+Pairs are kept in an append-only JSON lines file (EXAMPLES_PATH, default
+examples.jsonl in the dataset store), seeded from the evaluation golden set.
+Questions are embedded locally with hashed TF-IDF: word unigrams and bigrams are
+hashed into EMBEDDING_DIM signed buckets, so there is no vocabulary to maintain
+and nothing leaves the process. Retrieval is a cosine top-k over a NumPy
+matrix restricted to the request's dataset.
+
+Additions are appended to the file; every process picks up lines appended by
+others on its next search.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .dataset_store import store_dir
+from .schema import STOPWORDS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_DIM = 1024
+TOP_K = 3
+MIN_SIMILARITY = 0.25
+# IDF weights are recomputed for the whole matrix once the store has grown by this factor;
+# rows added in between are weighted with the current IDF
+REWEIGHT_GROWTH = 1.1
+GOLDEN_PATH = Path(__file__).resolve().parent.parent / "evaluation" / "golden.json"
+
+index = None
+
+
+def features(text: str) -> list[str]:
+    """Word unigrams and bigrams, lowercased, with stopwords and a naive plural strip."""
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        words.append(word[:-1] if len(word) > 3 and word.endswith("s") else word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def term_counts(text: str) -> dict[int, float]:
+    """Signed hashed term frequencies (1 + log count) of a text."""
+    counts = {}
+    for feature in features(text):
+        h = zlib.crc32(feature.encode())
+        bucket = h % EMBEDDING_DIM
+        counts[bucket] = counts.get(bucket, 0) + (1 if h & 0x80000000 else -1)
+    return {b: math.copysign(1 + math.log(abs(c)), c) for b, c in counts.items() if c}
+
+
+class ExampleIndex:
+    """Example store with a hashed TF-IDF vector index over its questions."""
+
+    def __init__(self, path: str | None = None, examples: list[dict] | None = None):
+        import numpy as np
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.examples = []
+        self.tf = np.zeros((64, EMBEDDING_DIM), dtype=np.float32)
+        self.df = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        self.offset = 0
+        self.weighted = None
+        self.weighted_rows = 0
+        self.weight_idf = None
+        self.idf_size = 0
+        self.datasets = None
+        self.extend(examples or [])
+        if path:
+            self.refresh()
+
+    def extend(self, examples: list[dict]):
+        import numpy as np
+
+        if not examples:
+            return
+        start, end = len(self.examples), len(self.examples) + len(examples)
+        if end > len(self.tf):
+            grown = np.zeros((max(end, 2 * len(self.tf)), EMBEDDING_DIM), dtype=np.float32)
+            grown[:start] = self.tf[:start]
+            self.tf = grown
+        for i, example in enumerate(examples, start):
+            for bucket, weight in term_counts(example["question"]).items():
+                self.tf[i, bucket] = weight
+        self.examples.extend(examples)
+        self.df += (self.tf[start:end] != 0).sum(axis=0)
+
+    def refresh(self):
+        """Load lines appended to the store file since the last load."""
+        if not self.path or not os.path.exists(self.path) or os.path.getsize(self.path) <= self.offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        self.offset += len(complete)
+        self.extend([json.loads(line) for line in complete.splitlines() if line.strip()])
+
+    def idf(self) -> "np.ndarray":
+        import numpy as np
+
+        return np.log((1 + len(self.examples)) / (1 + self.df)) + 1
+
+    def matrix(self) -> "np.ndarray":
+        """TF-IDF weighted, L2-normalized question vectors, updated for rows added since the last call."""
+        import numpy as np
+
+        n = len(self.examples)
+        if self.weighted is None or n > REWEIGHT_GROWTH * self.idf_size:
+            self.weight_idf = self.idf()
+            self.idf_size = n
+            self.weighted = np.zeros_like(self.tf)
+            self.weighted_rows = 0
+        if self.weighted_rows < n:
+            if len(self.weighted) < len(self.tf):
+                grown = np.zeros_like(self.tf)
+                grown[:self.weighted_rows] = self.weighted[:self.weighted_rows]
+                self.weighted = grown
+            rows = self.tf[self.weighted_rows:n] * self.weight_idf
+            norms = np.linalg.norm(rows, axis=1, keepdims=True)
+            self.weighted[self.weighted_rows:n] = rows / np.where(norms == 0, 1, norms)
+            self.weighted_rows = n
+            self.datasets = np.array([e["dataset"] for e in self.examples])
+        return self.weighted[:n]
+
+    def embed(self, text: str) -> "np.ndarray":
+        import numpy as np
+
+        vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        for bucket, weight in term_counts(text).items():
+            vector[bucket] = weight
+        vector *= self.weight_idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(self, question: str, dataset: str | None = None, k: int = TOP_K,
+               min_similarity: float = MIN_SIMILARITY) -> list[tuple[float, dict]]:
+        """Top-k (similarity, example) pairs for a question, most similar first."""
+        import numpy as np
+
+        with self.lock:
+            self.refresh()
+            if not self.examples:
+                return []
+            matrix = self.matrix()
+            scores = matrix @ self.embed(question)
+            if dataset is not None:
+                scores = np.where(self.datasets == dataset, scores, -1)
+            top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+            ranked = sorted(top, key=lambda i: -scores[i])
+            return [(float(scores[i]), self.examples[i]) for i in ranked if scores[i] >= min_similarity]
+
+    def add(self, question: str, sql: str, dataset: str) -> dict:
+        example = {"question": question, "sql": sql, "dataset": dataset, "added": round(time.time(), 3)}
+        with self.lock:
+            self.refresh()
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(example) + "\n")
+                self.offset = os.path.getsize(self.path)
+            self.extend([example])
+        return example
+
+    def excluding(self, question: str) -> "ExampleIndex":
+        """A copy without the examples for `question`, for leave-one-out evaluation."""
+        with self.lock:
+            self.refresh()
+            return ExampleIndex(examples=[e for e in self.examples if e["question"] != question])
+
+
+def golden_examples() -> list[dict]:
+    golden = json.loads(GOLDEN_PATH.read_text())
+    return [
+        {"question": case["question"], "sql": case["sql"], "dataset": dataset, "added": 0}
+        for dataset, cases in golden.items()
+        for case in cases
+    ]
+
+
+def get_example_index() -> ExampleIndex:
+    global index
+    if index is None:
+        path = os.getenv("EXAMPLES_PATH") or os.path.join(store_dir(), "examples.jsonl")
+        if not os.path.exists(path) and GOLDEN_PATH.exists():
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(json.dumps(e) + "\n" for e in golden_examples())
+            os.replace(tmp_path, path)
+        index = ExampleIndex(path)
+    return index
+
+
+def examples_enabled() -> bool:
+    return os.getenv("SQL_EXAMPLES", "1") != "0"
+
+
+def format_examples(examples: list[tuple[float, dict]]) -> str:
+    return "\n\n".join(f"Question: {e['question']}\nSQL: {e['sql']}" for _, e in examples)
@@ -0,0 +1,348 @@
+"""Chunked upload and streaming ingestion of CSV and Parquet files.
+
+An upload is a session: the client creates it, appends the file in chunks (each
+chunk carries the byte offset it starts at, so an interrupted upload resumes
+from the size reported by the session), then completes it. Completion parses
+the file in batches, so a file of any size is ingested in bounded memory:
+
+- CSV: column types are inferred from the first TYPE_SAMPLE_ROWS rows, and
+  every value is converted as it is read.
+- Parquet: types come from the file schema. Parquet needs pyarrow, which is
+  optional.
+
+Each upload becomes one table of an uploaded dataset in the dataset store.
+Uploading again to the same dataset adds or replaces a table, and the result is
+swapped in atomically like a generated dataset.
+"""
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import uuid
+from datetime import datetime
+from functools import lru_cache
+
+from .dataset_store import (
+    dataset_lock, dataset_path, register_dataset, registered_datasets, store_dir, temp_path, write_meta,
+)
+from .sample_data import DATASETS
+from .value_index import MAX_DISTINCT_VALUES, MAX_VALUE_LENGTH
+
+UPLOAD_FORMATS = ("csv", "parquet")
+DEFAULT_MAX_UPLOAD_MB = 1024
+BATCH_ROWS = 10000
+TYPE_SAMPLE_ROWS = 1000
+
+SQL_KEYWORDS = {
+    "all", "and", "as", "by", "case", "check", "create", "default", "delete", "distinct", "else", "end",
+    "from", "group", "having", "in", "index", "insert", "is", "join", "key", "limit", "not", "null",
+    "offset", "on", "or", "order", "primary", "references", "select", "table", "then", "union",
+    "unique", "update", "values", "when", "where",
+}
+INTEGER_PATTERN = re.compile(r"^[+-]?\d+$")
+
+
+def uploads_dir() -> str:
+    path = os.path.join(store_dir(), "uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def session_path(upload_id: str) -> str:
+    if not re.fullmatch(r"[0-9a-f]{32}", upload_id):
+        raise KeyError(f"Unknown upload: {upload_id}")
+    return os.path.join(uploads_dir(), f"{upload_id}.json")
+
+
+def part_path(upload_id: str) -> str:
+    return os.path.join(uploads_dir(), f"{upload_id}.part")
+
+
+@lru_cache(maxsize=1024)
+def usable_bare(ident: str) -> bool:
+    """Whether SQLite accepts the name unquoted as a table and column name."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute(f"CREATE TABLE {ident} ({ident} TEXT)")
+        conn.execute(f"SELECT {ident} FROM {ident} WHERE {ident} IS NULL GROUP BY {ident}")
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def identifier(name: str) -> str:
+    """Turn a file, table or column name into an SQL identifier that also works unquoted.
+
+    Generated SQL refers to tables and columns without quotes, so keywords get a "_" suffix.
+    """
+    ident = re.sub(r"\W+", "_", name.strip().lower()).strip("_") or "col"
+    if ident[0].isdigit():
+        ident = f"c_{ident}"
+    return f"{ident}_" if ident in SQL_KEYWORDS or not usable_bare(ident) else ident
+
+
+def quote(ident: str) -> str:
+    return '"' + ident.replace('"', '""') + '"'
+
+
+def unique_identifiers(names: list[str]) -> list[str]:
+    seen = set()
+    result = []
+    for name in names:
+        ident = base = identifier(name)
+        n = 2
+        while ident in seen:
+            ident = f"{base}_{n}"
+            n += 1
+        seen.add(ident)
+        result.append(ident)
+    return result
+
+
+def max_upload_bytes() -> int:
+    return int(os.getenv("UPLOAD_MAX_MB", DEFAULT_MAX_UPLOAD_MB)) * 1024 * 1024
+
+
+def create_upload(dataset: str, fmt: str = "csv", table: str | None = None, description: str | None = None) -> dict:
+    """Start an upload session for a new table of an uploaded dataset."""
+    if fmt not in UPLOAD_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt} (expected one of {', '.join(UPLOAD_FORMATS)})")
+    name = identifier(dataset)
+    if name in DATASETS:
+        raise ValueError(f"{name} is a built-in dataset")
+    if registered_datasets().get(name, {}).get("source", "upload") != "upload":
+        raise ValueError(f"{name} is a generated dataset build")
+
+    session = {
+        "id": uuid.uuid4().hex,
+        "dataset": name,
+        "table": identifier(table or dataset),
+        "format": fmt,
+        "description": description,
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(session_path(session["id"]), "w") as f:
+        json.dump(session, f)
+    open(part_path(session["id"]), "wb").close()
+    return {**session, "received": 0}
+
+
+def get_upload(upload_id: str) -> dict:
+    path = session_path(upload_id)
+    if not os.path.exists(path):
+        raise KeyError(f"Unknown upload: {upload_id}")
+    with open(path) as f:
+        session = json.load(f)
+    return {**session, "received": os.path.getsize(part_path(upload_id))}
+
+
+def open_chunk(upload_id: str, offset: int):
+    """Open the upload file for appending a chunk that starts at `offset`.
+
+    Raises ValueError if the offset does not match the bytes received so far;
+    the client should resume from the session's `received` size.
+    """
+    received = get_upload(upload_id)["received"]
+    if offset != received:
+        raise ValueError(f"Chunk offset {offset} does not match {received} bytes received")
+    return open(part_path(upload_id), "ab")
+
+
+def write_chunk(f, data: bytes, offset: int):
+    """Append data to an open upload file, cutting the file back to `offset` if the upload gets too large."""
+    if f.tell() + len(data) > max_upload_bytes():
+        f.truncate(offset)
+        raise OverflowError(f"Upload exceeds the {max_upload_bytes() // (1024 * 1024)} MB limit")
+    f.write(data)
+
+
+def delete_upload(upload_id: str):
+    get_upload(upload_id)
+    for path in (part_path(upload_id), session_path(upload_id)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def parse_value(value: str):
+    if value == "":
+        return None
+    if INTEGER_PATTERN.match(value):
+        return int(value)
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def infer_type(values: list) -> str:
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) for v in present):
+        return "INTEGER"
+    if present and all(isinstance(v, (int, float)) for v in present):
+        return "REAL"
+    return "TEXT"
+
+
+def csv_batches(path: str):
+    """Return (columns, types, batches) for a CSV file, reading it BATCH_ROWS rows at a time.
+
+    Batches are (rows, fraction of the file read) pairs.
+    """
+    size = os.path.getsize(path) or 1
+    raw = open(path, "rb")
+    f = io.TextIOWrapper(raw, newline="", encoding="utf-8-sig")
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if not header:
+        f.close()
+        raise ValueError("CSV file is empty")
+    width = len(header)
+
+    def parse(row):
+        row = row[:width] + [""] * (width - len(row))
+        return [parse_value(v) for v in row]
+
+    sample = []
+    for row in reader:
+        sample.append(parse(row))
+        if len(sample) >= TYPE_SAMPLE_ROWS:
+            break
+    types = [infer_type([r[i] for r in sample]) for i in range(width)]
+
+    def batches():
+        try:
+            yield sample, raw.tell() / size
+            batch = []
+            for row in reader:
+                batch.append(parse(row))
+                if len(batch) >= BATCH_ROWS:
+                    yield batch, raw.tell() / size
+                    batch = []
+            if batch:
+                yield batch, 1.0
+        finally:
+            f.close()
+
+    return header, types, batches()
+
+
+def parquet_batches(path: str):
+    """Return (columns, types, batches) for a Parquet file, reading it one record batch at a time.
+
+    Batches are (rows, fraction of the file read) pairs.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet uploads require pyarrow (pip install pyarrow)")
+
+    parquet = pq.ParquetFile(path)
+    schema = parquet.schema_arrow
+    types = []
+    for field in schema:
+        if pa.types.is_integer(field.type) or pa.types.is_boolean(field.type):
+            types.append("INTEGER")
+        elif pa.types.is_floating(field.type) or pa.types.is_decimal(field.type):
+            types.append("REAL")
+        else:
+            types.append("TEXT")
+
+    def convert(value, col_type):
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        if col_type == "REAL":
+            return float(value)
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def batches():
+        total = parquet.metadata.num_rows or 1
+        done = 0
+        for batch in parquet.iter_batches(batch_size=BATCH_ROWS):
+            columns = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+            done += batch.num_rows
+            yield [[convert(v, t) for v, t in zip(row, types)] for row in zip(*columns)], done / total
+
+    return schema.names, types, batches()
+
+
+def table_values(conn: sqlite3.Connection, table: str, columns: list[str], types: list[str]) -> list:
+    """Value index entries for the low-cardinality text columns of an ingested table."""
+    collected = []
+    for col, col_type in zip(columns, types):
+        if col_type != "TEXT":
+            continue
+        values = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {quote(col)} FROM {quote(table)} WHERE typeof({quote(col)}) = 'text' LIMIT ?",
+            (MAX_DISTINCT_VALUES + 1,),
+        )]
+        if values and len(values) <= MAX_DISTINCT_VALUES and max(len(v) for v in values) <= MAX_VALUE_LENGTH:
+            collected.extend((table, col, v) for v in sorted(values))
+    return collected
+
+
+def write_table(dataset: str, table: str, columns: list[str], types: list[str], batches, progress) -> tuple:
+    """Add or replace one table in a copy of the dataset's store file and swap it in."""
+    path = dataset_path(dataset)
+    tmp_path = temp_path(dataset)
+    existing = registered_datasets().get(dataset)
+    if existing and os.path.exists(path):
+        shutil.copyfile(path, tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        tables = [t for t in (existing or {}).get("tables", []) if t != table] + [table]
+        conn.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+        conn.execute(f"CREATE TABLE {quote(table)} ({', '.join(f'{quote(c)} {t}' for c, t in zip(columns, types))})")
+        if existing:
+            conn.execute("DELETE FROM _value_index WHERE table_name = ?", (table,))
+
+        placeholders = ", ".join("?" for _ in columns)
+        rows = 0
+        for batch, fraction in batches:
+            conn.executemany(f"INSERT INTO {quote(table)} VALUES ({placeholders})", batch)
+            rows += len(batch)
+            if progress is not None:
+                progress(table, rows, fraction)
+
+        version = datetime.now().isoformat(timespec="seconds")
+        write_meta(conn, version, tables, table_values(conn, table, columns, types))
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    os.replace(tmp_path, path)
+    return version, rows, tables
+
+
+def ingest_upload(upload_id: str, progress=None) -> dict:
+    """Parse a completed upload into its dataset's store file and register the dataset.
+
+    `progress(table, rows, fraction)` is called after every batch; an exception
+    raised from it aborts the ingest and leaves the store unchanged.
+    """
+    session = get_upload(upload_id)
+    dataset, table = session["dataset"], session["table"]
+    reader = csv_batches if session["format"] == "csv" else parquet_batches
+    header, types, batches = reader(part_path(upload_id))
+    columns = unique_identifiers(header)
+
+    with dataset_lock(dataset):
+        version, rows, tables = write_table(dataset, table, columns, types, batches, progress)
+        existing = registered_datasets().get(dataset, {})
+        register_dataset(dataset, {
+            "name": dataset,
+            "description": session["description"] or existing.get("description") or "Uploaded data",
+            "source": "upload",
+            "tables": tables,
+            "version": version,
+        })
+    delete_upload(upload_id)
+    return {"dataset": dataset, "table": table, "columns": columns, "types": types, "rows": rows, "version": version}
@@ -0,0 +1,335 @@
+"""Background jobs for long-running dataset builds and ingests.
+
+Jobs run on a process pool (JOB_WORKERS), so generating or parsing millions of
+rows never holds the request handlers' GIL. Workers report progress on a
+multiprocessing manager queue. A listener thread applies the progress reports to
+the job table and wakes the SSE subscribers of each job.
+
+Every change of a job's state is also written to jobs/<id>.json in the store
+directory, so all server worker processes can read and watch every job, not
+only the one that submitted it. Cancelling writes a jobs/<id>.cancel marker,
+which the job checks at every progress step.
+
+Job kinds:
+- dataset: rebuild a generated dataset, or build it with `history_days` of
+  history under a `target` name (see dataset_store.build_dataset).
+- ingest: parse a completed upload into the store (see ingest.ingest_upload).
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .dataset_store import build_dataset, get_dataset_schema, get_datasets, store_dir
+from .ingest import get_upload, identifier, ingest_upload
+from .sample_data import DATASETS, dataset_generators
+
+JOB_KINDS = ("dataset", "ingest")
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+# Share of a dataset build's progress for generating rows; the rest is writing the store file
+GENERATE_SHARE = 0.8
+MAX_FINISHED_JOBS = 100
+# Builds are generated in memory before they are written, so their history is capped
+MAX_HISTORY_DAYS = 730
+# How often a job submitted to another server worker is re-read while it is watched
+POLL_SECONDS = 0.5
+
+# Jobs submitted by this process that have not finished yet
+jobs = {}
+controls = {}
+subscribers = {}
+lock = threading.Lock()
+executor = None
+manager = None
+events = None
+
+
+class JobCancelled(Exception):
+    """Raised in a worker when its job has been cancelled."""
+
+
+def jobs_dir() -> str:
+    path = os.path.join(store_dir(), "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def job_path(job_id: str, suffix: str = "json") -> str:
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+        raise KeyError(f"Unknown job: {job_id}")
+    return os.path.join(jobs_dir(), f"{job_id}.{suffix}")
+
+
+def save_job(snap: dict):
+    path = job_path(snap["id"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snap, f)
+    os.replace(tmp_path, path)
+
+
+def load_job(job_id: str) -> dict:
+    try:
+        with open(job_path(job_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(f"Unknown job: {job_id}")
+
+
+def run_job(job_id: str, kind: str, params: dict, events, cancel_path: str) -> dict:
+    """Worker side: run one job, reporting progress and checking for cancellation."""
+    def send(**update):
+        if os.path.exists(cancel_path):
+            raise JobCancelled()
+        events.put((job_id, update))
+
+    send(status="running")
+    if kind == "ingest":
+        return ingest_upload(
+            params["upload_id"],
+            lambda table, rows, fraction: send(phase="ingesting", tables={table: rows}, fraction=fraction),
+        )
+
+    def progress(rows, days_done, days_total):
+        phase = "generating" if days_done < days_total else "writing"
+        send(phase=phase, tables=rows, fraction=GENERATE_SHARE * days_done / days_total)
+
+    dataset = params.get("target") or params["dataset"]
+    build_dataset(params["dataset"], params.get("target"), params.get("history_days"), progress)
+    schema = get_dataset_schema(dataset)
+    return {
+        "dataset": dataset,
+        "version": schema["version"],
+        "tables": {table: info["row_count"] for table, info in schema["tables"].items()},
+    }
+
+
+def snapshot(job: dict) -> dict:
+    return {**job, "tables": dict(job["tables"])}
+
+
+def notify(job_id: str, snap: dict):
+    for loop, queue in subscribers.get(job_id, []):
+        loop.call_soon_threadsafe(queue.put_nowait, snap)
+
+
+def apply_update(job_id: str, update: dict):
+    with lock:
+        job = jobs.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return
+        if update.pop("status", None) == "running":
+            job["status"] = "running"
+            job["started"] = time.time()
+        tables = update.pop("tables", {})
+        job["tables"].update(tables)
+        job.update(update)
+        if job["started"] and job["fraction"] > 0:
+            elapsed = time.time() - job["started"]
+            job["eta_seconds"] = round(elapsed * (1 - job["fraction"]) / job["fraction"], 1)
+        snap = snapshot(job)
+        save_job(snap)
+    notify(job_id, snap)
+
+
+def listen(queue):
+    """Listener thread: apply worker progress reports until shutdown() sends None."""
+    while True:
+        job_id, update = queue.get()
+        if job_id is None:
+            return
+        apply_update(job_id, update)
+
+
+def finish(job_id: str, future):
+    with lock:
+        job = jobs.pop(job_id)
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or isinstance(error, JobCancelled):
+            job["status"] = "cancelled"
+        elif error is not None:
+            job["status"] = "failed"
+            job["error"] = str(error) or type(error).__name__
+        else:
+            job["status"] = "succeeded"
+            job["result"] = future.result()
+            job["fraction"] = 1.0
+            job["eta_seconds"] = 0.0
+            if job["kind"] == "dataset":
+                job["tables"] = dict(job["result"]["tables"])
+        job["finished"] = time.time()
+        controls.pop(job_id, None)
+        snap = snapshot(job)
+        save_job(snap)
+    notify(job_id, snap)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global executor, manager, events
+    if executor is None:
+        manager = multiprocessing.Manager()
+        events = manager.Queue()
+        executor = ProcessPoolExecutor(max_workers=int(os.getenv("JOB_WORKERS", "2")))
+        threading.Thread(target=listen, args=(events,), daemon=True).start()
+    return executor
+
+
+def list_jobs() -> list[dict]:
+    """Jobs of every server worker, oldest first."""
+    snaps = []
+    for name in os.listdir(jobs_dir()):
+        if name.endswith(".json"):
+            try:
+                snaps.append(load_job(name[:-len(".json")]))
+            except (KeyError, ValueError):
+                # Removed by prune_finished() or being replaced meanwhile
+                continue
+    return sorted(snaps, key=lambda j: j["created"])
+
+
+def prune_finished():
+    finished = sorted((j for j in list_jobs() if j["status"] in TERMINAL_STATUSES), key=lambda j: j["finished"])
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        for suffix in ("json", "cancel"):
+            try:
+                os.remove(job_path(job["id"], suffix))
+            except FileNotFoundError:
+                pass
+
+
+def check_dataset_params(params: dict):
+    """Reject a dataset build that build_dataset() would only refuse once the job runs."""
+    dataset = params.get("dataset")
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown generated dataset: {dataset}")
+    target = params.get("target")
+    if target:
+        target = params["target"] = identifier(target)
+        existing = get_datasets().get(target)
+        if target != dataset and existing is not None and existing.get("source") != "build":
+            raise ValueError(f"Dataset {target} already exists")
+    if params.get("history_days") is not None:
+        if not 1 <= params["history_days"] <= MAX_HISTORY_DAYS:
+            raise ValueError(f"history_days must be between 1 and {MAX_HISTORY_DAYS}")
+        if not target or target == dataset:
+            raise ValueError("Building with a different history needs a target name")
+        if dataset not in dataset_generators()[1]:
+            raise ValueError(f"Dataset {dataset} has no day-partitioned history to scale")
+
+
+def submit_job(kind: str, params: dict) -> dict:
+    """Validate and queue a job; returns its initial state."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind} (expected one of {', '.join(JOB_KINDS)})")
+    if kind == "dataset":
+        check_dataset_params(params)
+    else:
+        get_upload(params.get("upload_id") or "")
+
+    pool = get_executor()
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "params": params,
+        "status": "queued",
+        "phase": None,
+        "tables": {},
+        "fraction": 0.0,
+        "eta_seconds": None,
+        "result": None,
+        "error": None,
+        "created": time.time(),
+        "started": None,
+        "finished": None,
+    }
+    prune_finished()
+    with lock:
+        jobs[job_id] = job
+        snap = snapshot(job)
+        save_job(snap)
+        future = pool.submit(run_job, job_id, kind, params, events, job_path(job_id, "cancel"))
+        controls[job_id] = future
+    future.add_done_callback(partial(finish, job_id))
+    return snap
+
+
+def get_job(job_id: str) -> dict:
+    with lock:
+        if job_id in jobs:
+            return snapshot(jobs[job_id])
+    return load_job(job_id)
+
+
+def cancel_job(job_id: str) -> dict:
+    """Cancel a queued job outright, or signal a running one to stop at its next progress step.
+
+    A job submitted by another server worker sees the cancel marker when it
+    starts or at its next progress step.
+    """
+    if load_job(job_id)["status"] not in TERMINAL_STATUSES:
+        open(job_path(job_id, "cancel"), "w").close()
+        with lock:
+            future = controls.get(job_id)
+        if future is not None:
+            future.cancel()
+    return get_job(job_id)
+
+
+async def poll_job(job_id: str):
+    """Follow a job submitted by another server worker through its state file."""
+    snap = await asyncio.to_thread(load_job, job_id)
+    yield snap
+    while snap["status"] not in TERMINAL_STATUSES:
+        await asyncio.sleep(POLL_SECONDS)
+        latest = await asyncio.to_thread(load_job, job_id)
+        if latest != snap:
+            snap = latest
+            yield snap
+
+
+async def watch_job(job_id: str):
+    """Yield the job's state now and after every change, until it finishes."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    with lock:
+        local = job_id in jobs
+        if local:
+            snap = snapshot(jobs[job_id])
+            subscribers.setdefault(job_id, []).append((loop, queue))
+    if not local:
+        async for snap in poll_job(job_id):
+            yield snap
+        return
+    try:
+        yield snap
+        while snap["status"] not in TERMINAL_STATUSES:
+            snap = await queue.get()
+            yield snap
+    finally:
+        with lock:
+            subscribers[job_id].remove((loop, queue))
+            if not subscribers[job_id]:
+                del subscribers[job_id]
+
+
+def shutdown():
+    """Cancel outstanding jobs and stop the pool, manager and listener."""
+    global executor, manager, events
+    if executor is None:
+        return
+    with lock:
+        pending = list(controls.items())
+    for job_id, future in pending:
+        if not future.cancel():
+            open(job_path(job_id, "cancel"), "w").close()
+    executor.shutdown(wait=True, cancel_futures=True)
+    events.put((None, None))
+    manager.shutdown()
+    executor = manager = events = None
@@ -1,12 +1,44 @@
+import asyncio
 import os
-from openai import AzureOpenAI
+import re
+import sqlite3
+import time
+from typing import TYPE_CHECKING
+
+from .downsample import describe_reduction
+from .examples import examples_enabled, format_examples, get_example_index
+from .llm_log import LLMRecorder, ReplayClient
+from .sample_data import get_datasets, get_summary_tables
+from .schema import find_values, format_schema, get_value_tokens, parse_schema, parse_schema_columns, prune_schema
+from .value_index import format_value_hints
+
+if TYPE_CHECKING:
+    from openai import AzureOpenAI
 
 client = None
+recorder = None
+
+# Keywords hinting that a question needs grouping across tables or multi-step logic
+JOIN_HINTS = (" per ", " by ", " each ", " across ", " compare", " versus ", " vs ", " for every ")
+ANALYTIC_HINTS = ("average", "avg", "median", "trend", "rank", "top ", "percentage", "percent", "%",
+                  "ratio", "growth", "cumulative", "over time", "without", "never", "missed", "most", "least")
+# Statement keywords only: REPLACE is also a string function, so just REPLACE INTO is rejected
+FORBIDDEN_SQL = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|ATTACH|DETACH|PRAGMA|VACUUM)\b|\bREPLACE\s+INTO\b", re.IGNORECASE
+)
+
+# max_tokens budgets per tier
+SQL_MAX_TOKENS = {"simple": 200, "complex": 500}
+SCRIPT_MAX_TOKENS = {"simple": 800, "complex": 1500}
 
 
-def get_client() -> AzureOpenAI:
+def get_client() -> "AzureOpenAI":
     global client
+    if client is None and os.getenv("LLM_REPLAY_PATH"):
+        client = ReplayClient(os.getenv("LLM_REPLAY_PATH"), float(os.getenv("LLM_REPLAY_SPEED", "0")))
     if client is None:
+        # Imported on first use: the openai package is slow to import and not needed to serve data
+        from openai import AzureOpenAI
         client = AzureOpenAI(
             api_key=os.getenv("AZURE_OPENAI_API_KEY"),
             api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
@@ -15,18 +47,179 @@ def get_client() -> AzureOpenAI:
     return client
 
 
-def get_deployment_name() -> str:
-    return os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4")
-
-
-async def generate_sql(question: str, schema: str) -> str:
-    llm = get_client()
-    deployment = get_deployment_name()
+def get_deployment_name(tier: str = "complex") -> str:
+    """Return the deployment for a tier; the fast deployment falls back to the default one."""
+    default = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4")
+    if tier == "simple":
+        return os.getenv("AZURE_OPENAI_DEPLOYMENT_FAST", default)
+    return default
+
+
+def mentioned_tables(question: str, tables: dict[str, list[str]]) -> set[str]:
+    """Tables whose name, singular form or a distinctive column appears in the question."""
+    q = question.lower()
+    mentioned = set()
+    for table, columns in tables.items():
+        words = {table.lower(), table.lower().rstrip("s")}
+        words.update(c.lower().replace("_", " ") for c in columns if c != "id" and c != "name" and not c.endswith("_id"))
+        if any(re.search(rf"\b{re.escape(w)}", q) for w in words if len(w) > 2):
+            mentioned.add(table)
+    return mentioned
+
+
+def classify_question(question: str, schema: str) -> str:
+    """Estimate question complexity: "simple" (single-table filter) or "complex" (joins/aggregation)."""
+    q = f" {question.lower()} "
+    tables = parse_schema(schema)
+    score = 0
+    if len(mentioned_tables(question, tables)) > 1:
+        score += 2
+    if any(hint in q for hint in JOIN_HINTS):
+        score += 1
+    if any(hint in q for hint in ANALYTIC_HINTS):
+        score += 1
+    if len(tables) > 4:
+        score += 1
+    if len(question.split()) > 20:
+        score += 1
+    return "simple" if score <= 1 else "complex"
+
+
+def clean_code(text: str) -> str:
+    """Strip markdown code fences the model sometimes adds despite instructions."""
+    text = re.sub(r"^```\w*\n?", "", text.strip())
+    return re.sub(r"\n?```$", "", text).strip()
+
+
+def validate_sql(sql: str, schema: str) -> str | None:
+    """Return an error message if the SQL is not a valid read-only query for the schema."""
+    if not re.match(r"^\s*(SELECT|WITH)\b", sql, re.IGNORECASE):
+        return "Query must start with SELECT or WITH"
+    if FORBIDDEN_SQL.search(sql):
+        return "Query must be read-only"
+    try:
+        conn = schema_connection(schema)
+    except sqlite3.Error as e:
+        return f"Invalid schema: {e}"
+    try:
+        conn.execute(f"EXPLAIN {sql}")
+    except sqlite3.Error as e:
+        return str(e)
+    finally:
+        conn.close()
+    return None
+
+
+def deny_attach(action: int, *args) -> int:
+    return sqlite3.SQLITE_DENY if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH) else sqlite3.SQLITE_OK
+
+
+def schema_connection(schema: str) -> sqlite3.Connection:
+    """In-memory database with the tables of a client-supplied schema.
+
+    The schema text is never run as a script: each table is rebuilt from the
+    parsed CREATE TABLE statements and executed on its own, and the connection
+    cannot attach database files.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+    conn.set_authorizer(deny_attach)
+    try:
+        for table, columns in parse_schema_columns(schema).items():
+            conn.execute(format_schema({table: columns}).rstrip(";"))
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def validate_script(script: str) -> str | None:
+    """Return an error message if the visualization script is obviously incomplete."""
+    if "return" not in script or "data" not in script or "layout" not in script:
+        return "Script must return an object with data and layout"
+    if script.count("{") != script.count("}"):
+        return "Script has unbalanced braces"
+    return None
+
+
+def get_recorder() -> LLMRecorder | None:
+    global recorder
+    if recorder is None and os.getenv("LLM_RECORD_PATH"):
+        recorder = LLMRecorder(os.getenv("LLM_RECORD_PATH"))
+    return recorder
+
+
+def chat(deployment: str, messages: list[dict], temperature: float, max_tokens: int):
+    """Send a chat completion request and return the raw response, recording it if enabled."""
+    start = time.perf_counter()
+    response = get_client().chat.completions.create(
+        model=deployment,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    log = get_recorder()
+    if log is not None:
+        log.record(deployment, messages, temperature, max_tokens, response, (time.perf_counter() - start) * 1000)
+    return response
+
+
+def prompt_schema(question: str, schema: str, dataset: str | None = None) -> str:
+    """The part of the schema shown to the model for a question."""
+    value_tokens = get_value_tokens(dataset) if dataset in get_datasets() else None
+    return prune_schema(question, schema, value_tokens, set(get_summary_tables()))
+
+
+def find_examples(question: str, dataset: str, schema: str) -> list[tuple[float, dict]]:
+    """Stored examples similar to the question whose SQL still runs against the schema the client sent."""
+    return [
+        (score, e) for score, e in get_example_index().search(question, dataset)
+        if validate_sql(e["sql"], schema) is None
+    ]
+
+
+async def generate_sql(question: str, schema: str, dataset: str | None = None) -> str:
+    full_schema = schema
+    known_dataset = dataset in get_datasets()
+    # The value index is read from the store, which may be rebuilding; keep that off the event loop
+    schema = await asyncio.to_thread(prompt_schema, question, schema, dataset)
+    tier = classify_question(question, schema)
+
+    tables = parse_schema(schema)
+    summaries = {t: d for t, d in get_summary_tables().items() if t in tables}
+    summary_text = ""
+    if summaries:
+        summary_lines = "\n".join(f"- {t}: {d}" for t, d in summaries.items())
+        summary_text = f"""
+
+Summary tables (precomputed daily rollups; prefer them over aggregating the raw tables whenever they can answer the question):
+{summary_lines}"""
+
+    values_text = ""
+    if known_dataset:
+        matches = [
+            m for m in await asyncio.to_thread(find_values, dataset, question)
+            if m[0] in tables and m[1] in tables[m[0]]
+        ]
+        if matches:
+            values_text = f"""
+
+Values from the data that match the question (use these exact literals):
+{format_value_hints(matches)}"""
+
+    examples_text = ""
+    if known_dataset and examples_enabled():
+        examples = await asyncio.to_thread(find_examples, question, dataset, full_schema)
+        if examples:
+            examples_text = f"""
+
+Examples of similar questions answered correctly for this database:
+{format_examples(examples)}"""
 
     system_prompt = f"""You are a SQL query generator. Given a natural language question about business data, generate a valid SQLite SELECT query.
 
 Database schema:
-{schema}
+{schema}{summary_text}{values_text}{examples_text}
 
 Rules:
 - Only generate SELECT queries (no INSERT, UPDATE, DELETE, DROP, etc.)
@@ -37,23 +230,23 @@ Rules:
 - Boolean values are stored as 0 (false) or 1 (true), not 'yes'/'no' or 'true'/'false'
 - Limit results to 100 rows unless specified otherwise"""
 
-    response = llm.chat.completions.create(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": question}
-        ],
-        temperature=0,
-        max_tokens=500,
-    )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": question}
+    ]
 
-    return response.choices[0].message.content.strip()
+    response = await asyncio.to_thread(chat, get_deployment_name(tier), messages, 0, SQL_MAX_TOKENS[tier])
+    sql = clean_code(response.choices[0].message.content)
 
+    # Escalate to the full deployment when the fast one produced an invalid query
+    if tier == "simple" and await asyncio.to_thread(validate_sql, sql, full_schema):
+        response = await asyncio.to_thread(chat, get_deployment_name("complex"), messages, 0, SQL_MAX_TOKENS["complex"])
+        sql = clean_code(response.choices[0].message.content)
 
-async def generate_visualization(columns: list[str], sample_data: list, user_hint: str | None = None) -> dict:
-    llm = get_client()
-    deployment = get_deployment_name()
+    return sql
 
+
+async def generate_visualization(columns: list[str], sample_data: list, user_hint: str | None = None) -> dict:
     hint_text = f"\nUser preference: {user_hint}" if user_hint else ""
 
     system_prompt = f"""You are a data visualization expert. Given table column names and sample data, generate a Plotly.js configuration object.
@@ -75,24 +268,31 @@ Total rows: {len(sample_data)}
 
 Generate a Plotly configuration to visualize this data."""
 
-    response = llm.chat.completions.create(
-        model=deployment,
-        messages=[
+    response = await asyncio.to_thread(
+        chat,
+        get_deployment_name(),
+        [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message}
         ],
-        temperature=0.3,
-        max_tokens=1000,
+        0.3,
+        1000,
     )
 
     return response.choices[0].message.content.strip()
 
 
-async def generate_visualization_script(columns: list[str], sample_data: list, user_hint: str | None = None) -> str:
-    llm = get_client()
-    deployment = get_deployment_name()
+async def generate_visualization_script(
+    columns: list[str], sample_data: list, user_hint: str | None = None, reduction: dict | None = None,
+    column_types: list[str] | None = None
+) -> str:
+    tier = "simple" if len(columns) <= 3 and not user_hint else "complex"
 
     hint_text = f"\nUser preference: {user_hint}" if user_hint else ""
+    rows_rule = "Use the full dataset from 'rows', not just sample data"
+    if reduction:
+        rows_rule = (f"The {describe_reduction(reduction)}. Plot 'rows' as provided "
+                     "and do not re-aggregate or resample them")
 
     system_prompt = f"""You are a data visualization expert. Generate JavaScript code that transforms query results into a Plotly.js configuration.
 
@@ -103,7 +303,7 @@ The code will run in a sandbox with these variables available:
 Rules:
 - Return ONLY JavaScript code, no markdown formatting or explanations
 - The code must return an object with "data" and "layout" keys
-- Use the full dataset from 'rows', not just sample data
+- {rows_rule}
 - Choose the most appropriate chart type based on the data
 - Use clear titles and axis labels derived from column names
 - Handle data transformation (e.g., grouping, aggregation) in the script
@@ -127,20 +327,29 @@ return {{
   }}
 }};"""
 
+    if sample_data or not column_types:
+        data_text = f"""Sample data (first 10 rows): {sample_data[:10]}
+Total rows: {len(sample_data)}{f" (reduced from {reduction['original_rows']})" if reduction else ""}"""
+    else:
+        data_text = "The query is still running, so no rows are available; handle any number of rows"
+    if column_types:
+        data_text = f"Column types: {dict(zip(columns, column_types))}\n{data_text}"
+
     user_message = f"""Columns: {columns}
-Sample data (first 10 rows): {sample_data[:10]}
-Total rows: {len(sample_data)}
+{data_text}
 
 Generate JavaScript code to create a Plotly visualization for this data."""
 
-    response = llm.chat.completions.create(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ],
-        temperature=0.3,
-        max_tokens=1500,
-    )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
 
-    return response.choices[0].message.content.strip()
+    response = await asyncio.to_thread(chat, get_deployment_name(tier), messages, 0.3, SCRIPT_MAX_TOKENS[tier])
+    script = response.choices[0].message.content.strip()
+
+    if tier == "simple" and validate_script(clean_code(script)):
+        response = await asyncio.to_thread(chat, get_deployment_name("complex"), messages, 0.3, SCRIPT_MAX_TOKENS["complex"])
+        script = response.choices[0].message.content.strip()
+
+    return script
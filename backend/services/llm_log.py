@@ -0,0 +1,128 @@
+"""Record/replay log for LLM interactions.
+
+The log is append-only JSON lines. Prompt texts are stored once, keyed by hash,
+and call entries reference them, so repeated system prompts cost a few bytes:
+
+    {"p": "<hash>", "text": "..."}
+    {"t": 1700000000.0, "m": "gpt-4", "msgs": [["system", "<hash>"], ["user", "<hash>"]],
+     "temp": 0, "max": 500, "out": "SELECT ...", "pt": 412, "ct": 38, "ms": 812.4}
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def call_key(messages: list, temperature: float, max_tokens: int) -> str:
+    return text_hash(json.dumps([messages, temperature, max_tokens]))
+
+
+class LLMRecorder:
+    """Appends every chat completion call to a log file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.known = set()
+        if os.path.exists(path):
+            for entry in read_log(path):
+                if "p" in entry:
+                    self.known.add(entry["p"])
+
+    def record(self, model: str, messages: list[dict], temperature: float, max_tokens: int,
+               response, latency_ms: float):
+        usage = getattr(response, "usage", None)
+        lines = []
+        refs = []
+        with self.lock:
+            for m in messages:
+                h = text_hash(m["content"])
+                if h not in self.known:
+                    self.known.add(h)
+                    lines.append({"p": h, "text": m["content"]})
+                refs.append([m["role"], h])
+            lines.append({
+                "t": round(time.time(), 3),
+                "m": model,
+                "msgs": refs,
+                "temp": temperature,
+                "max": max_tokens,
+                "out": response.choices[0].message.content,
+                "pt": usage.prompt_tokens if usage else None,
+                "ct": usage.completion_tokens if usage else None,
+                "ms": round(latency_ms, 1),
+            })
+            with open(self.path, "a", encoding="utf-8") as f:
+                for line in lines:
+                    f.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+
+def read_log(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_calls(path: str) -> list[dict]:
+    """Read a log and resolve prompt references back into full messages."""
+    texts = {}
+    calls = []
+    for entry in read_log(path):
+        if "p" in entry:
+            texts[entry["p"]] = entry["text"]
+        else:
+            entry["messages"] = [{"role": role, "content": texts[h]} for role, h in entry["msgs"]]
+            calls.append(entry)
+    return calls
+
+
+class ReplayClient:
+    """Serves chat completions from a recorded log instead of calling Azure.
+
+    Calls are matched on the exact prompt, parameters included; if the prompt
+    changed (e.g. a new build tweaked the system prompt) the last user message is
+    used instead. Repeated matches are served in recorded order. With speed > 0
+    each response is delayed by its recorded latency divided by speed.
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.by_key = {}
+        self.by_question = {}
+        for call in load_calls(path):
+            key = call_key(call["messages"], call["temp"], call["max"])
+            self.by_key.setdefault(key, []).append(call)
+            self.by_question.setdefault(call["messages"][-1]["content"], []).append(call)
+        self.served = {}
+        self.chat = SimpleNamespace(completions=self)
+
+    def next_call(self, bucket: str, key: str, calls: list[dict]) -> dict:
+        with self.lock:
+            n = self.served.get((bucket, key), 0)
+            self.served[(bucket, key)] = n + 1
+        return calls[n % len(calls)]
+
+    def create(self, model, messages, temperature, max_tokens):
+        key = call_key(messages, temperature, max_tokens)
+        question = messages[-1]["content"]
+        if key in self.by_key:
+            call = self.next_call("key", key, self.by_key[key])
+        elif question in self.by_question:
+            call = self.next_call("question", question, self.by_question[question])
+        else:
+            raise LookupError(f"No recorded LLM response for: {question[:80]}")
+
+        if self.speed > 0:
+            time.sleep(call["ms"] / 1000 / self.speed)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=call["out"]))],
+            usage=SimpleNamespace(prompt_tokens=call["pt"] or 0, completion_tokens=call["ct"] or 0),
+        )
@@ -0,0 +1,92 @@
+"""Partitioned generation across a process pool.
+
+Day-partitioned tables are split into contiguous date ranges. Each day draws
+from its own seeded RNG stream (see daily.py) and ids are derived from the
+date, so partitions can be generated in any process and in any order and
+still merge into exactly the rows a serial run produces.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# Below this many estimated rows, starting worker processes costs more than it saves
+PARALLEL_MIN_ROWS = 20000
+# Partitions per worker, so uneven date ranges still balance across the pool
+PARTITIONS_PER_WORKER = 2
+# Partitions of a serial run when progress is reported
+PROGRESS_PARTITIONS = 20
+
+
+def generation_workers() -> int:
+    return int(os.getenv("GENERATION_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def table_rng(dataset: str, table: str) -> random.Random:
+    """Independent, reproducible RNG stream for one table of a dataset."""
+    return random.Random(f"{dataset}:{table}")
+
+
+def partition_days(days: list, parts: int) -> list[list]:
+    """Split dates into at most `parts` contiguous, ordered ranges."""
+    size = max(1, -(-len(days) // parts))
+    return [days[i:i + size] for i in range(0, len(days), size)]
+
+
+def merge_tables(parts: list[dict]) -> dict:
+    """Concatenate the rows of per-partition {table: {columns, rows}} results in order."""
+    merged = {}
+    for part in parts:
+        for table, table_data in part.items():
+            if table in merged:
+                merged[table]["rows"].extend(table_data["rows"])
+            else:
+                merged[table] = {"columns": table_data["columns"], "rows": list(table_data["rows"])}
+    return merged
+
+
+def report_progress(progress, parts: list[dict], days_done: int, days_total: int):
+    rows = {}
+    for part in parts:
+        for table, table_data in part.items():
+            rows[table] = rows.get(table, 0) + len(table_data["rows"])
+    progress(rows, days_done, days_total)
+
+
+def generate_partitioned(generate_days, days: list, rows_per_day: float = 1, progress=None, **kwargs) -> dict:
+    """Run generate_days(days, **kwargs) over date-range partitions on a process pool.
+
+    Small workloads (estimated from rows_per_day) and single-worker configurations
+    run serially in this process. If given, progress(rows_per_table, days_done,
+    days_total) is called as partitions complete; an exception raised from it
+    cancels the remaining partitions.
+    """
+    workers = generation_workers()
+    if workers <= 1 or len(days) * rows_per_day < PARALLEL_MIN_ROWS:
+        if progress is None:
+            return generate_days(days, **kwargs)
+        parts = []
+        done = 0
+        for chunk in partition_days(days, PROGRESS_PARTITIONS):
+            parts.append(generate_days(chunk, **kwargs))
+            done += len(chunk)
+            report_progress(progress, parts, done, len(days))
+        return merge_tables(parts)
+
+    chunks = partition_days(days, workers * PARTITIONS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if progress is None:
+            parts = list(pool.map(partial(generate_days, **kwargs), chunks))
+        else:
+            futures = [pool.submit(generate_days, chunk, **kwargs) for chunk in chunks]
+            parts = []
+            done = 0
+            try:
+                for chunk, future in zip(chunks, futures):
+                    parts.append(future.result())
+                    done += len(chunk)
+                    report_progress(progress, parts, done, len(days))
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    return merge_tables(parts)
@@ -0,0 +1,75 @@
+"""Speculative visualization for the pipelined /api/ask endpoint.
+
+Once the SQL is generated, the columns it returns are known without running it
+(see dataset_store.query_columns), and their types can be predicted from the
+schema and the column names. The visualization script is generated from that
+predicted shape while the query executes, so its LLM call overlaps execution
+instead of following it. When the result is in, the speculative script is kept
+only if the actual shape matches the prediction and the script fits the
+result's columns; otherwise it is regenerated from the real rows.
+"""
+import re
+
+from .downsample import TYPE_SAMPLE_SIZE, infer_column_types
+from .llm import clean_code, validate_script
+from .schema import parse_schema_columns
+
+NUMERIC_TYPE = re.compile(r"INT|REAL|FLOA|DOUB|NUM|DEC", re.IGNORECASE)
+DATE_NAME = re.compile(r"(^|_)(date|datetime|timestamp)($|_)|_at$|_on$|^day$", re.IGNORECASE)
+LABEL_NAME = re.compile(
+    r"(^|_)(name|label|category|type|status|title|description|group|bucket|band|tier|level|period"
+    r"|year|quarter|month|week|weekday)($|_)",
+    re.IGNORECASE,
+)
+COLUMN_INDEX = re.compile(r"\b(?:row|r|d|columns)\s*\[\s*(\d+)\s*\]")
+COLUMN_LOOKUP = re.compile(r"columns\.indexOf\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
+
+def predict_column_types(columns: list[str], schema: str) -> list[str]:
+    """Predict infer_column_types() for a query's columns before it has run.
+
+    Columns named like a schema column take that column's declared type. Other
+    columns are computed, mostly aggregates, so they are taken as numbers unless
+    their name says they are dates or labels.
+    """
+    declared = {}
+    for table_columns in parse_schema_columns(schema).values():
+        for name, col_type in table_columns:
+            declared.setdefault(name.lower(), col_type)
+
+    types = []
+    for column in columns:
+        name = column.lower()
+        col_type = declared.get(name)
+        if DATE_NAME.search(name) and (col_type is None or not NUMERIC_TYPE.search(col_type)):
+            types.append("date")
+        elif col_type is not None:
+            types.append("number" if NUMERIC_TYPE.search(col_type) else "category")
+        else:
+            types.append("category" if LABEL_NAME.search(name) else "number")
+    return types
+
+
+def shape_matches(columns: list[str], types: list[str], actual_columns: list[str], rows: list) -> bool:
+    """Whether a result has the predicted columns and types; all-null columns match any type."""
+    if actual_columns != columns:
+        return False
+    for i, (predicted, actual) in enumerate(zip(types, infer_column_types(columns, rows))):
+        if predicted != actual and any(row[i] is not None for row in rows[:TYPE_SAMPLE_SIZE]):
+            return False
+    return True
+
+
+def check_script_columns(script: str, columns: list[str]) -> str | None:
+    """Return an error message if the script is incomplete or refers to columns the result lacks."""
+    code = clean_code(script)
+    error = validate_script(code)
+    if error:
+        return error
+    for index in COLUMN_INDEX.findall(code):
+        if int(index) >= len(columns):
+            return f"Script reads column {index}, but the result has {len(columns)} columns"
+    for name in COLUMN_LOOKUP.findall(code):
+        if name not in columns:
+            return f"Script looks up column {name}, which is not in the result"
+    return None
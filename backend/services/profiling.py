@@ -0,0 +1,160 @@
+"""On-demand CPU and memory profiling of a live worker process.
+
+CPU profiles come from a sampling thread that reads every thread's stack from
+sys._current_frames() at a fixed interval. They are returned as folded stacks
+("frame;frame;frame count" per line), which flamegraph.pl, speedscope and
+inferno read directly. Threads idling in the event loop's selector or in an
+executor waiting for work are skipped, so only busy stacks are counted.
+
+Memory profiles diff two tracemalloc snapshots taken at the start and end of
+the window and list the top allocation sites. Tracing is switched on only while
+a memory profile is active, unless it was already enabled.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+
+MAX_PROFILE_SECONDS = 60
+DEFAULT_INTERVAL_MS = 5
+TRACEMALLOC_FRAMES = 10
+MAX_STORED_PROFILES = 50
+
+# (file name, function) of frames where a thread is waiting rather than working
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("queues.py", "get"),
+    ("connection.py", "_recv"),
+    ("connection.py", "wait"),
+}
+
+profiles = OrderedDict()
+memory_lock = threading.Lock()
+memory_users = 0
+started_tracing = False
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples all threads' Python stacks on a background thread."""
+
+    def __init__(self, interval_ms: float = DEFAULT_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.counts = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stack-sampler", daemon=True)
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> "StackSampler":
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def stop(self) -> dict:
+        self.stopped.set()
+        self.thread.join()
+        return {
+            "kind": "cpu",
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "folded": fold(self.counts),
+        }
+
+
+def fold(counts: Counter) -> str:
+    """Folded stack lines, heaviest first."""
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+class MemoryTracer:
+    """Diffs tracemalloc snapshots between start() and stop()."""
+
+    def __init__(self, limit: int = 25):
+        self.limit = limit
+
+    def start(self) -> "MemoryTracer":
+        global memory_users, started_tracing
+        with memory_lock:
+            if memory_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            memory_users += 1
+        self.started = time.perf_counter()
+        self.before = tracemalloc.take_snapshot()
+        return self
+
+    def stop(self) -> dict:
+        global memory_users, started_tracing
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with memory_lock:
+            memory_users -= 1
+            if memory_users == 0 and started_tracing:
+                tracemalloc.stop()
+                started_tracing = False
+
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(self.before.filter_traces(filters), "lineno")
+        return {
+            "kind": "memory",
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "traced_current_mb": round(current / 1e6, 3),
+            "traced_peak_mb": round(peak / 1e6, 3),
+            "top": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in diff[:self.limit]
+            ],
+        }
+
+
+def start_profile(kind: str, interval_ms: float = DEFAULT_INTERVAL_MS, limit: int = 25):
+    if kind == "cpu":
+        return StackSampler(interval_ms).start()
+    if kind == "memory":
+        return MemoryTracer(limit).start()
+    raise ValueError(f"Unknown profile kind: {kind} (expected cpu or memory)")
+
+
+def store_profile(result: dict, label: str) -> str:
+    """Keep a per-request profile for later retrieval; returns its id."""
+    profile_id = uuid.uuid4().hex[:12]
+    profiles[profile_id] = {"id": profile_id, "label": label, "created": time.time(), **result}
+    while len(profiles) > MAX_STORED_PROFILES:
+        profiles.popitem(last=False)
+    return profile_id
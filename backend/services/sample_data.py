@@ -1,7 +1,7 @@
-import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from .security_data import generate_security_data
+from .daily import ID_STRIDE, day_number, day_rng, daily_count, first_id, history_window
+from .partitions import generate_partitioned, table_rng
 
 # Shared name data
 FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Emma", "Frank", "Grace", "Henry",
@@ -62,8 +62,13 @@ REGIONS = ["North", "South", "East", "West"]
 SEGMENTS = ["Enterprise", "SMB", "Consumer", "Government"]
 
 
-def generate_sales_data():
-    random.seed(42)
+SALES_HISTORY_DAYS = 365
+SALES_PER_DAY = 500 / 365
+SALES_COLUMNS = ["id", "date", "product_id", "customer_id", "quantity", "amount"]
+
+
+def generate_sales_dimensions():
+    rng = table_rng("sales", "customers")
 
     products = []
     for i, (name, category, price) in enumerate(PRODUCTS, start=1):
@@ -73,31 +78,43 @@ def generate_sales_data():
     used_names = set()
     for i in range(1, 51):
         while True:
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
             if name not in used_names:
                 used_names.add(name)
                 break
         customers.append({
             "id": i, "name": name,
-            "region": random.choice(REGIONS),
-            "segment": random.choice(SEGMENTS)
+            "region": rng.choice(REGIONS),
+            "segment": rng.choice(SEGMENTS)
         })
 
-    sales = []
-    end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - timedelta(days=365)
-    for i in range(1, 501):
-        product = random.choice(products)
-        customer = random.choice(customers)
-        days_offset = random.randint(0, 364)
-        sale_date = start_date + timedelta(days=days_offset)
-        quantity = random.randint(1, 10)
-        amount = round(product["price"] * quantity, 2)
-        sales.append({
-            "id": i, "date": sale_date.strftime("%Y-%m-%d"),
-            "product_id": product["id"], "customer_id": customer["id"],
-            "quantity": quantity, "amount": amount
-        })
+    return products, customers
+
+
+def generate_sales_days(days, products=None, customers=None):
+    """Generate the sales rows for the given dates."""
+    if products is None:
+        products, customers = generate_sales_dimensions()
+
+    rows = []
+    for day in days:
+        rng = day_rng("sales", day)
+        for n in range(1, daily_count(rng, SALES_PER_DAY) + 1):
+            product = rng.choice(products)
+            customer = rng.choice(customers)
+            quantity = rng.randint(1, 10)
+            amount = round(product["price"] * quantity, 2)
+            rows.append([
+                day_number(day) * ID_STRIDE + n, day.strftime("%Y-%m-%d"),
+                product["id"], customer["id"], quantity, amount
+            ])
+
+    return {"sales": {"columns": SALES_COLUMNS, "rows": rows}}
+
+
+def generate_sales_data(as_of: date | None = None, history_days: int = SALES_HISTORY_DAYS, progress=None):
+    as_of = as_of or date.today()
+    products, customers = generate_sales_dimensions()
 
     return {
         "tables": {
@@ -109,10 +126,14 @@ def generate_sales_data():
                 "columns": ["id", "name", "region", "segment"],
                 "rows": [[c["id"], c["name"], c["region"], c["segment"]] for c in customers]
             },
-            "sales": {
-                "columns": ["id", "date", "product_id", "customer_id", "quantity", "amount"],
-                "rows": [[s["id"], s["date"], s["product_id"], s["customer_id"], s["quantity"], s["amount"]] for s in sales]
-            }
+            **generate_partitioned(
+                generate_sales_days,
+                history_window(as_of, history_days),
+                rows_per_day=SALES_PER_DAY,
+                progress=progress,
+                products=products,
+                customers=customers,
+            )
         }
     }
 
@@ -143,33 +164,37 @@ JOB_TITLES = {
 
 PERFORMANCE_RATINGS = ["Exceeds Expectations", "Meets Expectations", "Needs Improvement", "Outstanding"]
 
+# Hire dates count back from a fixed date so employee rows do not change from day to day
+HR_REFERENCE_DATE = datetime(2025, 1, 1)
 
-def generate_hr_data():
-    random.seed(43)
 
+def generate_hr_data():
     departments = []
     for i, (name, location, lat, lon) in enumerate(DEPARTMENTS, start=1):
         departments.append({"id": i, "name": name, "location": location, "lat": lat, "lon": lon})
 
+    # Each table draws from its own stream, so tables can be generated independently
+    rng = table_rng("hr", "employees")
     employees = []
     used_names = set()
     for i in range(1, 101):
         while True:
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
             if name not in used_names:
                 used_names.add(name)
                 break
-        dept = random.choice(departments)
-        hire_date = datetime.now() - timedelta(days=random.randint(0, 2500))
-        salary = random.randint(50, 200) * 1000
+        dept = rng.choice(departments)
+        hire_date = HR_REFERENCE_DATE - timedelta(days=rng.randint(0, 2500))
+        salary = rng.randint(50, 200) * 1000
         employees.append({
             "id": i, "name": name,
             "department_id": dept["id"],
-            "title": random.choice(JOB_TITLES[dept["name"]]),
+            "title": rng.choice(JOB_TITLES[dept["name"]]),
             "hire_date": hire_date.strftime("%Y-%m-%d"),
             "salary": salary
         })
 
+    rng = table_rng("hr", "performance_reviews")
     reviews = []
     for i, emp in enumerate(employees, start=1):
         for year in [2022, 2023, 2024]:
@@ -177,8 +202,8 @@ def generate_hr_data():
                 "id": len(reviews) + 1,
                 "employee_id": emp["id"],
                 "year": year,
-                "rating": random.choice(PERFORMANCE_RATINGS),
-                "score": round(random.uniform(2.5, 5.0), 1)
+                "rating": rng.choice(PERFORMANCE_RATINGS),
+                "score": round(rng.uniform(2.5, 5.0), 1)
             })
 
     return {
@@ -250,26 +275,24 @@ PRODUCT_TEMPLATES = {
 
 def generate_products(count=200):
     """Generate a list of products across categories."""
-    random.seed(44)
+    rng = table_rng("inventory", "products")
     products = []
     categories = list(PRODUCT_TEMPLATES.keys())
 
     for i in range(count):
         category = categories[i % len(categories)]
         template = PRODUCT_TEMPLATES[category]
-        prefix = random.choice(template["prefixes"])
-        item = random.choice(template["items"])
+        prefix = rng.choice(template["prefixes"])
+        item = rng.choice(template["items"])
         name = f"{prefix} {item} {i + 1}"
-        price = round(random.uniform(*template["price_range"]), 2)
-        supplier = random.choice(template["suppliers"])
+        price = round(rng.uniform(*template["price_range"]), 2)
+        supplier = rng.choice(template["suppliers"])
         products.append((name, category, price, supplier))
 
     return products
 
 
 def generate_inventory_data():
-    random.seed(44)
-
     warehouses = []
     for i, (name, city, capacity) in enumerate(WAREHOUSES, start=1):
         warehouses.append({"id": i, "name": name, "city": city, "capacity": capacity})
@@ -287,12 +310,13 @@ def generate_inventory_data():
             "unit_cost": price, "supplier_id": supplier_map[supplier_name]
         })
 
+    rng = table_rng("inventory", "stock_levels")
     stock_levels = []
     for product in products:
         for warehouse in warehouses:
-            qty = random.randint(0, 500)
-            reorder_level = random.randint(20, 100)
-            reorder_target = reorder_level + random.randint(50, 150)
+            qty = rng.randint(0, 500)
+            reorder_level = rng.randint(20, 100)
+            reorder_target = reorder_level + rng.randint(50, 150)
             stock_levels.append({
                 "id": len(stock_levels) + 1,
                 "product_id": product["id"],
@@ -331,8 +355,17 @@ PRIORITIES = ["Low", "Medium", "High", "Critical"]
 STATUSES = ["open", "in_progress", "waiting_on_customer", "resolved", "closed"]
 
 
-def generate_support_data():
-    random.seed(45)
+SUPPORT_HISTORY_DAYS = 300
+TICKETS_PER_DAY = 1.0
+TICKET_COLUMNS = ["id", "customer_id", "agent_id", "category", "priority", "status", "created_at", "resolved_at"]
+
+# Realistic distribution of statuses:
+# ~20% open, ~15% in_progress, ~10% waiting, ~30% resolved, ~25% closed
+STATUS_WEIGHTS = ["open"] * 20 + ["in_progress"] * 15 + ["waiting_on_customer"] * 10 + ["resolved"] * 30 + ["closed"] * 25
+
+
+def generate_support_dimensions():
+    rng = table_rng("support", "customers")
 
     # Customers
     customers = []
@@ -340,14 +373,14 @@ def generate_support_data():
     plans = ["Free", "Basic", "Pro", "Enterprise"]
     for i in range(1, 76):
         while True:
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
             if name not in used_names:
                 used_names.add(name)
                 break
         customers.append({
             "id": i, "name": name,
             "email": f"{name.lower().replace(' ', '.')}@example.com",
-            "plan": random.choice(plans)
+            "plan": rng.choice(plans)
         })
 
     # Agents
@@ -356,40 +389,52 @@ def generate_support_data():
     teams = ["Tier 1", "Tier 2", "Tier 3", "Billing"]
     for i in range(1, 13):
         while True:
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
             if name not in agent_names and name not in used_names:
                 agent_names.add(name)
                 break
         agents.append({
             "id": i, "name": name,
-            "team": random.choice(teams)
+            "team": rng.choice(teams)
         })
 
-    # Tickets - ensure a realistic distribution of statuses
-    # ~20% open, ~15% in_progress, ~10% waiting, ~30% resolved, ~25% closed
-    tickets = []
-    end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - timedelta(days=300)
-    status_weights = ["open"] * 20 + ["in_progress"] * 15 + ["waiting_on_customer"] * 10 + ["resolved"] * 30 + ["closed"] * 25
-
-    for i in range(1, 301):
-        customer = random.choice(customers)
-        agent = random.choice(agents)
-        created = start_date + timedelta(days=random.randint(0, 300), hours=random.randint(0, 23))
-        status = random.choice(status_weights)
-        resolved = None
-        if status in ["resolved", "closed"]:
-            resolved = created + timedelta(hours=random.randint(1, 72))
-        tickets.append({
-            "id": i,
-            "customer_id": customer["id"],
-            "agent_id": agent["id"],
-            "category": random.choice(TICKET_CATEGORIES),
-            "priority": random.choice(PRIORITIES),
-            "status": status,
-            "created_at": created.strftime("%Y-%m-%d %H:%M"),
-            "resolved_at": resolved.strftime("%Y-%m-%d %H:%M") if resolved else None
-        })
+    return customers, agents
+
+
+def generate_support_days(days, customers=None, agents=None):
+    """Generate the tickets created on the given dates."""
+    if customers is None:
+        customers, agents = generate_support_dimensions()
+
+    rows = []
+    for day in days:
+        rng = day_rng("support", day)
+        day_start = datetime(day.year, day.month, day.day)
+        for n in range(1, daily_count(rng, TICKETS_PER_DAY) + 1):
+            customer = rng.choice(customers)
+            agent = rng.choice(agents)
+            created = day_start + timedelta(hours=rng.randint(0, 23))
+            status = rng.choice(STATUS_WEIGHTS)
+            resolved = None
+            if status in ["resolved", "closed"]:
+                resolved = created + timedelta(hours=rng.randint(1, 72))
+            rows.append([
+                day_number(day) * ID_STRIDE + n,
+                customer["id"],
+                agent["id"],
+                rng.choice(TICKET_CATEGORIES),
+                rng.choice(PRIORITIES),
+                status,
+                created.strftime("%Y-%m-%d %H:%M"),
+                resolved.strftime("%Y-%m-%d %H:%M") if resolved else None
+            ])
+
+    return {"tickets": {"columns": TICKET_COLUMNS, "rows": rows}}
+
+
+def generate_support_data(as_of: date | None = None, history_days: int = SUPPORT_HISTORY_DAYS, progress=None):
+    as_of = as_of or date.today()
+    customers, agents = generate_support_dimensions()
 
     return {
         "tables": {
@@ -401,17 +446,23 @@ def generate_support_data():
                 "columns": ["id", "name", "team"],
                 "rows": [[a["id"], a["name"], a["team"]] for a in agents]
             },
-            "tickets": {
-                "columns": ["id", "customer_id", "agent_id", "category", "priority", "status", "created_at", "resolved_at"],
-                "rows": [[t["id"], t["customer_id"], t["agent_id"], t["category"], t["priority"], t["status"], t["created_at"], t["resolved_at"]] for t in tickets]
-            }
+            **generate_partitioned(
+                generate_support_days,
+                history_window(as_of, history_days),
+                rows_per_day=TICKETS_PER_DAY,
+                progress=progress,
+                customers=customers,
+                agents=agents,
+            )
         }
     }
 
 
 # ============== MAIN API ==============
 
-def generate_sample_data(dataset: str = "sales"):
+def dataset_generators():
+    from .security_data import generate_security_data, generate_security_days, SECURITY_HISTORY_DAYS
+
     generators = {
         "sales": generate_sales_data,
         "hr": generate_hr_data,
@@ -419,10 +470,79 @@ def generate_sample_data(dataset: str = "sales"):
         "support": generate_support_data,
         "security": generate_security_data,
     }
+    # Datasets with day-partitioned tables: (days of history, per-day generator)
+    daily = {
+        "sales": (SALES_HISTORY_DAYS, generate_sales_days),
+        "support": (SUPPORT_HISTORY_DAYS, generate_support_days),
+        "security": (SECURITY_HISTORY_DAYS, generate_security_days),
+    }
+    return generators, daily
+
+
+# Multiplier from first_id(day) to the smallest id a day produces in each day-partitioned table
+DAILY_ID_SCALE = {
+    "sales": 1,
+    "tickets": 1,
+    "patrol_reports": 1,
+    "patrol_report_checkpoints": ID_STRIDE,
+    "daily_site_stats": 1,
+    "daily_officer_stats": 1,
+    "daily_spec_stats": 1,
+}
+
+
+def generate_sample_data(dataset: str = "sales", as_of: date | None = None, history_days: int | None = None,
+                         progress=None):
+    """Generate a dataset; `history_days` scales the history of day-partitioned datasets.
+
+    `progress` is passed to generate_partitioned() and only reported for
+    day-partitioned datasets.
+    """
+    generators, daily = dataset_generators()
     if dataset not in generators:
         raise ValueError(f"Unknown dataset: {dataset}")
+    if dataset in daily:
+        return generators[dataset](as_of, history_days or daily[dataset][0], progress=progress)
+    if history_days is not None:
+        raise ValueError(f"Dataset {dataset} has no day-partitioned history to scale")
     return generators[dataset]()
 
 
+def generate_sample_delta(dataset: str, since: date, as_of: date | None = None):
+    """Rows added and expired between the dataset generated on `since` and on `as_of`.
+
+    Only day-partitioned tables change. For each, `rows` holds the rows of the
+    days after `since`, and rows with an id below `expired_before_id` have aged
+    out of the history window.
+    """
+    as_of = as_of or date.today()
+    generators, daily = dataset_generators()
+    if dataset not in generators:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    if since > as_of:
+        raise ValueError(f"Version {since.isoformat()} is newer than {as_of.isoformat()}")
+
+    delta = {"version": as_of.isoformat(), "since": since.isoformat(), "tables": {}}
+    if dataset not in daily:
+        return delta
+
+    history, generate_days = daily[dataset]
+    window = history_window(as_of, history)
+    added = generate_partitioned(generate_days, [day for day in window if day > since])
+    for table, table_data in added.items():
+        table_data["expired_before_id"] = first_id(window[0]) * DAILY_ID_SCALE[table]
+        delta["tables"][table] = table_data
+    return delta
+
+
+def get_summary_tables():
+    """Descriptions of precomputed summary tables, by table name."""
+    from .security_data import ROLLUP_TABLES
+
+    return {table: description for table, (_, _, description) in ROLLUP_TABLES.items()}
+
+
 def get_datasets():
-    return DATASETS
+    from .dataset_store import registered_datasets
+
+    return {**DATASETS, **registered_datasets()}
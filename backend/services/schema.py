@@ -0,0 +1,199 @@
+import re
+
+from .dataset_store import get_value_index
+from .value_index import lookup_values
+
+# Tables are pruned only when the schema has at least this many of them
+PRUNE_MIN_TABLES = 4
+# Columns are pruned only for tables wider than this
+PRUNE_MIN_COLUMNS = 12
+
+STOPWORDS = {"the", "and", "for", "with", "show", "what", "which", "how", "many", "much", "are", "was",
+             "were", "has", "have", "had", "did", "does", "all", "from", "that", "this", "there", "their",
+             "list", "give", "get", "find", "each", "per", "by", "of", "in", "on", "at", "to", "me", "is"}
+
+
+def parse_schema_columns(schema: str) -> dict[str, list[tuple[str, str]]]:
+    """Parse CREATE TABLE statements into a {table: [(column, type)]} mapping."""
+    tables = {}
+    for name, body in re.findall(r'CREATE TABLE\s+"?(\w+)"?\s*\((.*?)\)\s*(?:;|$)', schema, re.IGNORECASE | re.DOTALL):
+        columns = []
+        for col in body.split(","):
+            parts = col.strip().split(None, 1)
+            if parts:
+                columns.append((parts[0].strip('"'), parts[1] if len(parts) > 1 else ""))
+        tables[name] = columns
+    return tables
+
+
+def parse_schema(schema: str) -> dict[str, list[str]]:
+    """Parse CREATE TABLE statements into a {table: [columns]} mapping."""
+    return {table: [c for c, _ in cols] for table, cols in parse_schema_columns(schema).items()}
+
+
+def format_schema(tables: dict[str, list[tuple[str, str]]]) -> str:
+    """Render a {table: [(column, type)]} mapping back into CREATE TABLE statements."""
+    statements = []
+    for table, columns in tables.items():
+        column_defs = ", ".join(f"{c} {t}".strip() for c, t in columns)
+        statements.append(f"CREATE TABLE {table} ({column_defs})")
+    return ";\n".join(statements) + ";"
+
+
+def tokenize(text: str) -> set[str]:
+    """Lowercase word tokens with a naive plural strip, minus stopwords."""
+    tokens = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS or len(word) < 3:
+            continue
+        tokens.add(word[:-1] if len(word) > 3 and word.endswith("s") else word)
+    return tokens
+
+
+def foreign_keys(tables: dict[str, list[str]]) -> list[tuple[str, str, str]]:
+    """Infer (table, column, referenced_table) links from the xxx_id naming convention."""
+    links = []
+    for table, columns in tables.items():
+        for col in columns:
+            if not col.endswith("_id"):
+                continue
+            base = col[:-3]
+            for candidate in (base, base + "s", base + "es"):
+                if candidate in tables and candidate != table:
+                    links.append((table, col, candidate))
+                    break
+    return links
+
+
+def join_path(start: str, goal: str, links: list[tuple[str, str, str]]) -> list[str]:
+    """Shortest chain of tables joining start to goal (breadth-first over foreign keys)."""
+    neighbours = {}
+    for table, _, ref in links:
+        neighbours.setdefault(table, set()).add(ref)
+        neighbours.setdefault(ref, set()).add(table)
+    previous = {start: None}
+    queue = [start]
+    while queue:
+        current = queue.pop(0)
+        if current == goal:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = previous[current]
+            return path[::-1]
+        for nxt in sorted(neighbours.get(current, ())):
+            if nxt not in previous:
+                previous[nxt] = current
+                queue.append(nxt)
+    return []
+
+
+def build_value_tokens(index: dict) -> dict[tuple[str, str], set[str]]:
+    """Group word tokens of indexed values as {(table, column): tokens}."""
+    tokens = {}
+    for table, col, value, _ in index["entries"]:
+        tokens.setdefault((table, col), set()).update(tokenize(value))
+    return tokens
+
+
+_value_tokens_cache = {}
+
+
+def get_value_tokens(dataset: str) -> dict[tuple[str, str], set[str]]:
+    """Value tokens for a dataset, rebuilt whenever its value index is regenerated."""
+    index = get_value_index(dataset)
+    cached = _value_tokens_cache.get(dataset)
+    if cached is None or cached[0] is not index:
+        cached = (index, build_value_tokens(index))
+        _value_tokens_cache[dataset] = cached
+    return cached[1]
+
+
+def find_values(dataset: str, question: str) -> list[tuple[str, str, str, float]]:
+    """Resolve literal mentions in the question against the dataset's value index."""
+    return lookup_values(get_value_index(dataset), question)
+
+
+def score_tables(question: str, tables: dict[str, list[str]], value_tokens: dict | None = None) -> dict[str, int]:
+    """Relevance score per table from name, column and sample value matches.
+
+    Question tokens that match more than half of the tables (e.g. "patrol" in the
+    security schema) do not discriminate between tables and are ignored.
+    """
+    q_tokens = tokenize(question)
+    matches = {}
+    for table, columns in tables.items():
+        hits = [(3, tokenize(table.replace("_", " ")) & q_tokens)]
+        for col in columns:
+            if col == "id" or col.endswith("_id"):
+                continue
+            hits.append((2, tokenize(col.replace("_", " ")) & q_tokens))
+            if value_tokens:
+                hits.append((1, value_tokens.get((table, col), set()) & q_tokens))
+        matches[table] = hits
+
+    frequency = {}
+    for hits in matches.values():
+        for token in set().union(*(tokens for _, tokens in hits)):
+            frequency[token] = frequency.get(token, 0) + 1
+    common = {token for token, count in frequency.items() if count > len(tables) / 2}
+
+    return {
+        table: sum(weight for weight, tokens in hits if tokens - common)
+        for table, hits in matches.items()
+    }
+
+
+def prune_schema(question: str, schema: str, value_tokens: dict | None = None,
+                 summary_tables: set[str] | None = None) -> str:
+    """Keep only the tables (and, for wide tables, columns) relevant to the question plus join paths.
+
+    Summary tables repeat the metrics of the tables they roll up, so they would
+    make those tokens look common; they are left out of scoring and kept only as
+    companions of a kept table they share a key with, when the question matches
+    one of their columns.
+    """
+    tables = parse_schema_columns(schema)
+    if len(tables) < PRUNE_MIN_TABLES:
+        return schema
+
+    names = {table: [c for c, _ in cols] for table, cols in tables.items()}
+    summaries = [table for table in names if table in (summary_tables or ())]
+    core = {table: cols for table, cols in names.items() if table not in summaries}
+    scores = score_tables(question, core, value_tokens)
+    selected = [table for table in core if scores[table] > 0]
+    if not selected:
+        return schema
+
+    links = foreign_keys(core)
+    keep = set(selected)
+    for other in selected[1:]:
+        keep.update(join_path(selected[0], other, links))
+
+    q_tokens = tokenize(question)
+    for table, _, ref in links:
+        for kept, other in ((table, ref), (ref, table)):
+            if kept in selected and tokenize(other.replace("_", " ")) & q_tokens:
+                keep.add(other)
+
+    kept_columns = {c for table in keep for c in names[table] if c != "id"}
+    for table in summaries:
+        columns = [c for c in names[table] if c != "id"]
+        tokens = set().union(*(tokenize(c.replace("_", " ")) for c in columns))
+        if tokens & q_tokens and set(columns) & kept_columns:
+            keep.add(table)
+    if len(keep) == len(tables):
+        return schema
+
+    pruned = {}
+    for table, columns in tables.items():
+        if table not in keep:
+            continue
+        if len(columns) > PRUNE_MIN_COLUMNS:
+            columns = [
+                (c, t) for c, t in columns
+                if c == "id" or c.endswith("_id") or tokenize(c.replace("_", " ")) & q_tokens
+                or (value_tokens and value_tokens.get((table, c), set()) & q_tokens)
+            ]
+        pruned[table] = columns
+    return format_schema(pruned)
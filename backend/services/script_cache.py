@@ -0,0 +1,79 @@
+"""Cache of generated visualization scripts keyed by result shape.
+
+Scripts only read `columns` and `rows`, so a script generated for one result
+works for any later result with the same column names and types and the same
+user hint. Entries are evicted least-recently-used beyond VIZ_SCRIPT_CACHE_SIZE,
+and VIZ_SCRIPT_CACHE_PATH, if set, persists the cache as JSON across restarts.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 256
+
+cache = None
+
+
+def normalize_hint(hint: str | None) -> str:
+    return " ".join((hint or "").lower().split())
+
+
+def shape_key(columns: list[str], types: list[str], hint: str | None) -> str:
+    """Cache key for a result: column names, column types (see infer_column_types) and normalized hint."""
+    return json.dumps([columns, types, normalize_hint(hint)])
+
+
+class ScriptCache:
+    """LRU map from result shape to script, optionally persisted to a JSON file."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, path: str | None = None):
+        self.max_size = max_size
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for key, script in json.load(f):
+                    self.entries[key] = script
+            while len(self.entries) > max_size:
+                self.entries.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            script = self.entries.get(key)
+            if script is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return script
+
+    def put(self, key: str, script: str):
+        with self.lock:
+            self.entries[key] = script
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            if self.path:
+                self.save()
+
+    def save(self):
+        """Write entries oldest first, so loading them back preserves LRU order."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+def get_script_cache() -> ScriptCache:
+    global cache
+    if cache is None:
+        cache = ScriptCache(int(os.getenv("VIZ_SCRIPT_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                            os.getenv("VIZ_SCRIPT_CACHE_PATH"))
+    return cache
@@ -1,5 +1,16 @@
+import os
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from .daily import ID_STRIDE, day_number, day_rng, history_window
+from .partitions import generate_partitioned
+
+# Days of patrol history ending on the as-of date
+SECURITY_HISTORY_DAYS = 181
+# Rough checkpoint visits plus reports generated per day, used to decide on parallel generation
+SECURITY_ROWS_PER_DAY = 400
+# Share of patrols that start after the latest allowed start time
+LATE_START_RATE = 0.05
 
 # UK Cities with coordinates
 UK_SITES = [
@@ -104,7 +115,7 @@ POLICE_ACTIONS = [
 ]
 
 
-def generate_time_in_range(start_hour, start_min, end_hour, end_min):
+def generate_time_in_range(start_hour, start_min, end_hour, end_min, rng=random):
     """Generate a random time within a range, handling overnight spans."""
     start_mins = start_hour * 60 + start_min
     end_mins = end_hour * 60 + end_min
@@ -112,13 +123,20 @@ def generate_time_in_range(start_hour, start_min, end_hour, end_min):
     if end_mins < start_mins:  # Overnight
         end_mins += 24 * 60
 
-    random_mins = random.randint(start_mins, end_mins)
+    random_mins = rng.randint(start_mins, end_mins)
     if random_mins >= 24 * 60:
         random_mins -= 24 * 60
 
     return random_mins // 60, random_mins % 60
 
 
+def shift_datetime(shift_date, hour, minute):
+    """Datetime of a night-shift clock time; times before noon fall on the following day."""
+    if hour < 12:
+        shift_date = shift_date + timedelta(days=1)
+    return shift_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
 def parse_time(time_str):
     """Parse HH:MM string to hours and minutes."""
     parts = time_str.split(":")
@@ -130,9 +148,9 @@ def time_to_minutes(hour, minute):
     return hour * 60 + minute
 
 
-def generate_patrol_specs_for_site(site_id):
+def generate_patrol_specs_for_site(site_id, rng=random):
     """Generate 1-3 non-overlapping patrol specifications for a site."""
-    num_specs = random.randint(1, 3)
+    num_specs = rng.randint(1, 3)
     specs = []
 
     # Available night shift window: 18:00 to 05:00 (next day)
@@ -150,10 +168,10 @@ def generate_patrol_specs_for_site(site_id):
             break
 
         # Window size: mostly 1-2 hours, sometimes 10-30 mins
-        if random.random() < 0.2:  # 20% chance of short window
-            window_size = random.randint(10, 30)
+        if rng.random() < 0.2:  # 20% chance of short window
+            window_size = rng.randint(10, 30)
         else:
-            window_size = random.randint(60, 120)
+            window_size = rng.randint(60, 120)
 
         # Earliest start time
         earliest_mins = current_time
@@ -195,22 +213,22 @@ def generate_patrol_specs_for_site(site_id):
     return specs
 
 
-def generate_checkpoints_for_spec(spec_id, site_name):
+def generate_checkpoints_for_spec(spec_id, site_name, rng=random):
     """Generate 10-50 checkpoints for a patrol specification."""
-    num_checkpoints = random.randint(10, 50)
+    num_checkpoints = rng.randint(10, 50)
     checkpoints = []
 
     # Select random prefixes
-    selected_prefixes = random.sample(CHECKPOINT_PREFIXES, min(num_checkpoints, len(CHECKPOINT_PREFIXES)))
+    selected_prefixes = rng.sample(CHECKPOINT_PREFIXES, min(num_checkpoints, len(CHECKPOINT_PREFIXES)))
 
     # If we need more, add numbered variants
     while len(selected_prefixes) < num_checkpoints:
-        base = random.choice(CHECKPOINT_PREFIXES)
+        base = rng.choice(CHECKPOINT_PREFIXES)
         num = len([p for p in selected_prefixes if p.startswith(base)]) + 1
         selected_prefixes.append(f"{base} {num}")
 
     for i, prefix in enumerate(selected_prefixes[:num_checkpoints]):
-        detail = random.choice(CHECKPOINT_DETAILS)
+        detail = rng.choice(CHECKPOINT_DETAILS)
         checkpoints.append({
             "id": i + 1,  # Will be reassigned globally later
             "spec_id": spec_id,
@@ -221,14 +239,14 @@ def generate_checkpoints_for_spec(spec_id, site_name):
     return checkpoints
 
 
-def generate_serious_comment(checkpoint_name, timestamp):
+def generate_serious_comment(checkpoint_name, timestamp, rng=random):
     """Generate a detailed comment for a serious deviation."""
-    template = random.choice(SERIOUS_INCIDENTS)
-    detail = random.choice(INCIDENT_DETAILS)
+    template = rng.choice(SERIOUS_INCIDENTS)
+    detail = rng.choice(INCIDENT_DETAILS)
 
     # 70% chance police were involved
-    if random.random() < 0.7:
-        police = random.choice(POLICE_ACTIONS).format(ref=f"CR{random.randint(10000, 99999)}")
+    if rng.random() < 0.7:
+        police = rng.choice(POLICE_ACTIONS).format(ref=f"CR{rng.randint(10000, 99999)}")
     else:
         police = "Incident documented for site management review."
 
@@ -241,9 +259,9 @@ def generate_serious_comment(checkpoint_name, timestamp):
     return comment
 
 
-def generate_security_data():
-    """Generate the complete security patrolling dataset."""
-    random.seed(100)  # For reproducibility
+def generate_security_structure():
+    """Generate sites, patrol specifications and checkpoints (fixed, independent of the date)."""
+    rng = random.Random(100)  # For reproducibility
 
     # Generate sites
     sites = []
@@ -261,7 +279,7 @@ def generate_security_data():
     patrol_specs = []
     spec_id_counter = 1
     for site in sites:
-        site_specs = generate_patrol_specs_for_site(site["id"])
+        site_specs = generate_patrol_specs_for_site(site["id"], rng)
         for spec in site_specs:
             spec["id"] = spec_id_counter
             patrol_specs.append(spec)
@@ -271,10 +289,11 @@ def generate_security_data():
     checkpoints = []
     checkpoint_id_counter = 1
     spec_checkpoints = {}  # Map spec_id to list of checkpoint ids
+    sites_by_id = {site["id"]: site for site in sites}
 
     for spec in patrol_specs:
-        site = next(s for s in sites if s["id"] == spec["site_id"])
-        spec_cps = generate_checkpoints_for_spec(spec["id"], site["name"])
+        site = sites_by_id[spec["site_id"]]
+        spec_cps = generate_checkpoints_for_spec(spec["id"], site["name"], rng)
         spec_checkpoints[spec["id"]] = []
 
         for cp in spec_cps:
@@ -283,111 +302,241 @@ def generate_security_data():
             spec_checkpoints[spec["id"]].append(checkpoint_id_counter)
             checkpoint_id_counter += 1
 
-    # Generate patrol_checkpoints (linking table)
-    patrol_checkpoint_links = []
-    for spec in patrol_specs:
-        cp_ids = spec_checkpoints[spec["id"]]
-        for order, cp_id in enumerate(cp_ids, start=1):
-            patrol_checkpoint_links.append({
-                "patrol_spec_id": spec["id"],
-                "checkpoint_id": cp_id,
-                "display_order": order,
-            })
+    return {
+        "sites": sites,
+        "patrol_specs": patrol_specs,
+        "checkpoints": checkpoints,
+        "spec_checkpoints": spec_checkpoints,
+        "checkpoint_names": {cp["id"]: cp["name"] for cp in checkpoints},
+    }
 
-    # Generate patrol reports for 6 months
-    patrol_reports = []
-    report_checkpoints = []
-    report_id_counter = 1
-    report_cp_id_counter = 1
 
-    # 6 months of data ending today
-    end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    start_date = end_date - timedelta(days=180)
+def generate_patrols_for_day(day, structure):
+    """Generate the patrol reports and checkpoint visits for the night shift starting on day.
 
-    current_date = start_date
-    while current_date <= end_date:
-        for spec in patrol_specs:
-            # Parse earliest and latest times
-            earliest_h, earliest_m = parse_time(spec["earliest_start"])
-            latest_h, latest_m = parse_time(spec["latest_start"])
+    Report ids are day_number * ID_STRIDE + spec position and checkpoint visit
+    ids are report_id * ID_STRIDE + visit position, so they are stable across runs.
+    Also returns per-patrol statistics from which the rollup tables are built.
+    """
+    rng = day_rng("security", day)
+    current_date = datetime(day.year, day.month, day.day)
+    spec_checkpoints = structure["spec_checkpoints"]
+    checkpoint_names = structure["checkpoint_names"]
 
-            # Generate random start time within window
-            start_h, start_m = generate_time_in_range(earliest_h, earliest_m, latest_h, latest_m)
+    patrol_reports = []
+    report_checkpoints = []
+    patrol_stats = []
 
-            # Determine if start is before or after midnight for date handling
-            if start_h < 12:  # After midnight, use next day
-                patrol_date = current_date + timedelta(days=1)
-            else:
-                patrol_date = current_date
+    for spec_pos, spec in enumerate(structure["patrol_specs"]):
+        report_id = day_number(day) * ID_STRIDE + spec_pos
 
-            start_time = patrol_date.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+        # Parse earliest and latest times
+        earliest_h, earliest_m = parse_time(spec["earliest_start"])
+        latest_h, latest_m = parse_time(spec["latest_start"])
 
-            # Patrol duration: 30-90 mins based on checkpoint count
-            num_cps = len(spec_checkpoints[spec["id"]])
-            duration_mins = random.randint(max(30, num_cps), min(90, num_cps * 3))
-            end_time = start_time + timedelta(minutes=duration_mins)
+        # Generate random start time within window, occasionally starting late
+        earliest_time = shift_datetime(current_date, earliest_h, earliest_m)
+        latest_time = shift_datetime(current_date, latest_h, latest_m)
+        late_start = rng.random() < LATE_START_RATE
+        if late_start:
+            start_time = latest_time + timedelta(minutes=rng.randint(5, 45))
+        else:
+            start_h, start_m = generate_time_in_range(earliest_h, earliest_m, latest_h, latest_m, rng)
+            start_time = shift_datetime(current_date, start_h, start_m)
+
+        # Patrol duration: 30-90 mins based on checkpoint count
+        num_cps = len(spec_checkpoints[spec["id"]])
+        duration_mins = rng.randint(max(30, num_cps), min(90, num_cps * 3))
+        end_time = start_time + timedelta(minutes=duration_mins)
+
+        officer = rng.choice(OFFICERS)
+
+        patrol_reports.append([
+            report_id,
+            spec["id"],
+            officer,
+            start_time.strftime("%Y-%m-%d %H:%M"),
+            end_time.strftime("%Y-%m-%d %H:%M"),
+        ])
+
+        # Generate checkpoint visits
+        cp_ids = spec_checkpoints[spec["id"]].copy()
+
+        # 10% of patrols have missing checkpoints
+        if rng.random() < 0.1:
+            num_missing = rng.randint(1, max(1, len(cp_ids) // 5))  # Up to 20%
+            for _ in range(num_missing):
+                if len(cp_ids) > 5:  # Keep at least 5
+                    cp_ids.remove(rng.choice(cp_ids))
+
+        # Spread timestamps chronologically
+        time_per_cp = duration_mins / len(cp_ids) if cp_ids else 0
+
+        # Determine if this report has deviations (10% chance)
+        has_deviations = rng.random() < 0.1
+        deviation_cp_ids = []
+        if has_deviations:
+            num_deviations = rng.randint(1, max(1, len(cp_ids) // 10))
+            deviation_cp_ids = rng.sample(cp_ids, min(num_deviations, len(cp_ids)))
+
+        serious = 0
+        for idx, cp_id in enumerate(cp_ids):
+            # Calculate timestamp
+            cp_time = start_time + timedelta(minutes=time_per_cp * idx + rng.uniform(0, time_per_cp * 0.5))
+
+            has_deviation = cp_id in deviation_cp_ids
+            action = None
+            comment = None
+
+            if has_deviation:
+                action = rng.choice(DEVIATION_ACTIONS)
+
+                # 25% of deviations are serious with detailed comments
+                if rng.random() < 0.25:
+                    comment = generate_serious_comment(checkpoint_names[cp_id], cp_time, rng)
+                    serious += 1
+
+            report_checkpoints.append([
+                report_id * ID_STRIDE + idx,
+                report_id,
+                cp_id,
+                cp_time.strftime("%Y-%m-%d %H:%M"),
+                has_deviation,
+                action,
+                comment,
+            ])
+
+        patrol_stats.append({
+            "spec_id": spec["id"],
+            "site_id": spec["site_id"],
+            "officer": officer,
+            "visits": len(cp_ids),
+            "missed": num_cps - len(cp_ids),
+            "deviations": len(deviation_cp_ids),
+            "serious": serious,
+            "late_start": late_start,
+            "start_delay": int((start_time - earliest_time).total_seconds() // 60),
+            "duration": duration_mins,
+        })
 
-            officer = random.choice(OFFICERS)
+    return patrol_reports, report_checkpoints, patrol_stats
+
+
+# Materialized daily rollups: table -> (grouping column, stats key, description)
+ROLLUP_TABLES = {
+    "daily_site_stats": (
+        "site_id", "site_id",
+        "One row per site per shift date: patrols, checkpoint_visits, missed_checkpoints, deviations, "
+        "serious_incidents, late_starts, avg_start_delay_mins, avg_duration_mins. Join sites on site_id.",
+    ),
+    "daily_officer_stats": (
+        "officer_name", "officer",
+        "One row per officer per shift date with the same metrics as daily_site_stats.",
+    ),
+    "daily_spec_stats": (
+        "patrol_specification_id", "spec_id",
+        "One row per patrol specification per shift date with the same metrics as daily_site_stats. "
+        "Join patrol_specifications on patrol_specification_id.",
+    ),
+}
+ROLLUP_METRICS = ["patrols", "checkpoint_visits", "missed_checkpoints", "deviations", "serious_incidents",
+                  "late_starts", "avg_start_delay_mins", "avg_duration_mins"]
+
+
+def rollups_enabled():
+    return os.getenv("SECURITY_ROLLUPS", "1") != "0"
+
+
+def build_rollups(day, patrol_stats):
+    """Aggregate one shift date's patrol statistics into rows for each rollup table.
+
+    shift_date is the date the night shift starts, so patrols starting after
+    midnight count towards the previous date.
+    """
+    tables = {}
+    for table, (column, key, _) in ROLLUP_TABLES.items():
+        groups = {}
+        for stats in patrol_stats:
+            groups.setdefault(stats[key], []).append(stats)
+
+        rows = []
+        for n, (group, members) in enumerate(sorted(groups.items())):
+            count = len(members)
+            rows.append([
+                day_number(day) * ID_STRIDE + n,
+                day.strftime("%Y-%m-%d"),
+                group,
+                count,
+                sum(m["visits"] for m in members),
+                sum(m["missed"] for m in members),
+                sum(m["deviations"] for m in members),
+                sum(m["serious"] for m in members),
+                sum(m["late_start"] for m in members),
+                round(sum(m["start_delay"] for m in members) / count, 1),
+                round(sum(m["duration"] for m in members) / count, 1),
+            ])
+        tables[table] = {"columns": ["id", "shift_date", column] + ROLLUP_METRICS, "rows": rows}
+    return tables
+
+
+PATROL_REPORT_COLUMNS = ["id", "patrol_specification_id", "officer_name", "start_time", "end_time"]
+REPORT_CHECKPOINT_COLUMNS = ["id", "patrol_report_id", "checkpoint_id", "timestamp", "has_deviation", "action_taken", "comment"]
+
+
+def generate_security_days(days, structure=None, include_rollups=None):
+    """Generate the patrol_reports and patrol_report_checkpoints rows (and rollups) for the given dates."""
+    if structure is None:
+        structure = generate_security_structure()
+    if include_rollups is None:
+        include_rollups = rollups_enabled()
 
-            patrol_reports.append({
-                "id": report_id_counter,
+    patrol_reports = []
+    report_checkpoints = []
+    rollups = {table: [] for table in ROLLUP_TABLES}
+    for day in days:
+        reports, visits, patrol_stats = generate_patrols_for_day(day, structure)
+        patrol_reports.extend(reports)
+        report_checkpoints.extend(visits)
+        if include_rollups:
+            for table, table_data in build_rollups(day, patrol_stats).items():
+                rollups[table].extend(table_data["rows"])
+
+    tables = {
+        "patrol_reports": {"columns": PATROL_REPORT_COLUMNS, "rows": patrol_reports},
+        "patrol_report_checkpoints": {"columns": REPORT_CHECKPOINT_COLUMNS, "rows": report_checkpoints},
+    }
+    if include_rollups:
+        for table, (column, _, _) in ROLLUP_TABLES.items():
+            tables[table] = {"columns": ["id", "shift_date", column] + ROLLUP_METRICS, "rows": rollups[table]}
+    return tables
+
+
+def generate_security_data(as_of: date | None = None, history_days: int = SECURITY_HISTORY_DAYS,
+                           include_rollups: bool | None = None, progress=None):
+    """Generate the complete security patrolling dataset.
+
+    With rollups enabled (SECURITY_ROLLUPS, on by default) the daily_*_stats
+    tables described in ROLLUP_TABLES are emitted alongside the raw patrols.
+    """
+    as_of = as_of or date.today()
+    if include_rollups is None:
+        include_rollups = rollups_enabled()
+    structure = generate_security_structure()
+    sites = structure["sites"]
+    patrol_specs = structure["patrol_specs"]
+    checkpoints = structure["checkpoints"]
+
+    # Generate patrol_checkpoints (linking table)
+    patrol_checkpoint_links = []
+    for spec in patrol_specs:
+        cp_ids = structure["spec_checkpoints"][spec["id"]]
+        for order, cp_id in enumerate(cp_ids, start=1):
+            patrol_checkpoint_links.append({
                 "patrol_spec_id": spec["id"],
-                "officer_name": officer,
-                "start_time": start_time.strftime("%Y-%m-%d %H:%M"),
-                "end_time": end_time.strftime("%Y-%m-%d %H:%M"),
+                "checkpoint_id": cp_id,
+                "display_order": order,
             })
 
-            # Generate checkpoint visits
-            cp_ids = spec_checkpoints[spec["id"]].copy()
-
-            # 10% of patrols have missing checkpoints
-            if random.random() < 0.1:
-                num_missing = random.randint(1, max(1, len(cp_ids) // 5))  # Up to 20%
-                for _ in range(num_missing):
-                    if len(cp_ids) > 5:  # Keep at least 5
-                        cp_ids.remove(random.choice(cp_ids))
-
-            # Spread timestamps chronologically
-            time_per_cp = duration_mins / len(cp_ids) if cp_ids else 0
-
-            # Determine if this report has deviations (10% chance)
-            has_deviations = random.random() < 0.1
-            deviation_cp_ids = []
-            if has_deviations:
-                num_deviations = random.randint(1, max(1, len(cp_ids) // 10))
-                deviation_cp_ids = random.sample(cp_ids, min(num_deviations, len(cp_ids)))
-
-            for idx, cp_id in enumerate(cp_ids):
-                # Calculate timestamp
-                cp_time = start_time + timedelta(minutes=time_per_cp * idx + random.uniform(0, time_per_cp * 0.5))
-
-                has_deviation = cp_id in deviation_cp_ids
-                action = None
-                comment = None
-
-                if has_deviation:
-                    action = random.choice(DEVIATION_ACTIONS)
-
-                    # 25% of deviations are serious with detailed comments
-                    if random.random() < 0.25:
-                        cp_info = next(c for c in checkpoints if c["id"] == cp_id)
-                        comment = generate_serious_comment(cp_info["name"], cp_time)
-
-                report_checkpoints.append({
-                    "id": report_cp_id_counter,
-                    "patrol_report_id": report_id_counter,
-                    "checkpoint_id": cp_id,
-                    "timestamp": cp_time.strftime("%Y-%m-%d %H:%M"),
-                    "has_deviation": has_deviation,
-                    "action_taken": action,
-                    "comment": comment,
-                })
-                report_cp_id_counter += 1
-
-            report_id_counter += 1
-
-        current_date += timedelta(days=1)
-
     return {
         "tables": {
             "sites": {
@@ -406,13 +555,14 @@ def generate_security_data():
                 "columns": ["patrol_specification_id", "checkpoint_id", "display_order"],
                 "rows": [[pc["patrol_spec_id"], pc["checkpoint_id"], pc["display_order"]] for pc in patrol_checkpoint_links]
             },
-            "patrol_reports": {
-                "columns": ["id", "patrol_specification_id", "officer_name", "start_time", "end_time"],
-                "rows": [[pr["id"], pr["patrol_spec_id"], pr["officer_name"], pr["start_time"], pr["end_time"]] for pr in patrol_reports]
-            },
-            "patrol_report_checkpoints": {
-                "columns": ["id", "patrol_report_id", "checkpoint_id", "timestamp", "has_deviation", "action_taken", "comment"],
-                "rows": [[rc["id"], rc["patrol_report_id"], rc["checkpoint_id"], rc["timestamp"], rc["has_deviation"], rc["action_taken"], rc["comment"]] for rc in report_checkpoints]
-            }
+            # 6 months of patrols ending today, generated in date-range partitions
+            **generate_partitioned(
+                generate_security_days,
+                history_window(as_of, history_days),
+                rows_per_day=SECURITY_ROWS_PER_DAY,
+                progress=progress,
+                structure=structure,
+                include_rollups=include_rollups,
+            )
         }
     }
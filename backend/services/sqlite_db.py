@@ -0,0 +1,37 @@
+import sqlite3
+
+
+def column_type(rows: list, index: int) -> str:
+    """Infer a SQLite column type from the first non-null value in a column."""
+    for row in rows:
+        value = row[index]
+        if value is None:
+            continue
+        if isinstance(value, (bool, int)):
+            return "INTEGER"
+        if isinstance(value, float):
+            return "REAL"
+        return "TEXT"
+    return "TEXT"
+
+
+def build_schema(data: dict) -> str:
+    """Render CREATE TABLE statements for a dataset, in the format the frontend sends to /api/query."""
+    statements = []
+    for table, table_data in data["tables"].items():
+        column_defs = ", ".join(
+            f"{col} {column_type(table_data['rows'], i)}" for i, col in enumerate(table_data["columns"])
+        )
+        statements.append(f"CREATE TABLE {table} ({column_defs})")
+    return ";\n".join(statements) + ";"
+
+
+def create_database(data: dict, path: str = ":memory:") -> sqlite3.Connection:
+    """Create a SQLite database at path and load every table of the dataset into it."""
+    conn = sqlite3.connect(path)
+    conn.executescript(build_schema(data))
+    for table, table_data in data["tables"].items():
+        placeholders = ", ".join("?" for _ in table_data["columns"])
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", table_data["rows"])
+    conn.commit()
+    return conn
@@ -0,0 +1,93 @@
+import re
+
+# Only string columns with at most this many distinct values are indexed
+MAX_DISTINCT_VALUES = 100
+# Longer strings (free-text comments, descriptions) are not useful as literals
+MAX_VALUE_LENGTH = 60
+# Minimum trigram similarity for a question phrase to resolve to a value
+MIN_SIMILARITY = 0.6
+MAX_PHRASE_WORDS = 4
+MAX_MATCHES = 10
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def collect_values(data: dict) -> list[tuple[str, str, str]]:
+    """Distinct (table, column, value) triples of low-cardinality string columns."""
+    collected = []
+    for table, table_data in data["tables"].items():
+        for i, col in enumerate(table_data["columns"]):
+            values = set()
+            for row in table_data["rows"]:
+                if isinstance(row[i], str):
+                    values.add(row[i])
+                    if len(values) > MAX_DISTINCT_VALUES:
+                        break
+            if not values or len(values) > MAX_DISTINCT_VALUES:
+                continue
+            if max(len(v) for v in values) > MAX_VALUE_LENGTH:
+                continue
+            collected.extend((table, col, v) for v in sorted(values))
+    return collected
+
+
+def index_values(values: list[tuple[str, str, str]]) -> dict:
+    """Build a trigram index over (table, column, value) triples."""
+    entries = [(table, col, value, trigrams(value)) for table, col, value in values]
+    postings = {}
+    for idx, (_, _, _, grams) in enumerate(entries):
+        for gram in grams:
+            postings.setdefault(gram, []).append(idx)
+    return {"entries": entries, "postings": postings}
+
+
+def build_value_index(data: dict) -> dict:
+    """Build a trigram index over distinct values of low-cardinality string columns."""
+    return index_values(collect_values(data))
+
+
+def question_phrases(question: str) -> list[str]:
+    words = re.findall(r"[A-Za-z0-9]+", question)
+    phrases = []
+    for n in range(MAX_PHRASE_WORDS, 0, -1):
+        for i in range(len(words) - n + 1):
+            phrase = " ".join(words[i:i + n])
+            if len(phrase) >= 4:
+                phrases.append(phrase)
+    return phrases
+
+
+def lookup_values(index: dict, question: str) -> list[tuple[str, str, str, float]]:
+    """Resolve phrases in the question to exact (table, column, value, similarity) matches."""
+    entries, postings = index["entries"], index["postings"]
+    best = {}
+    for phrase in question_phrases(question):
+        grams = trigrams(phrase)
+        counts = {}
+        for gram in grams:
+            for idx in postings.get(gram, ()):
+                counts[idx] = counts.get(idx, 0) + 1
+        for idx, shared in counts.items():
+            value_grams = entries[idx][3]
+            similarity = shared / (len(grams) + len(value_grams) - shared)
+            if similarity >= MIN_SIMILARITY and similarity > best.get(idx, 0):
+                best[idx] = similarity
+
+    ranked = sorted(best.items(), key=lambda item: -item[1])[:MAX_MATCHES]
+    return [(entries[idx][0], entries[idx][1], entries[idx][2], round(score, 2)) for idx, score in ranked]
+
+
+def format_value_hints(matches: list[tuple[str, str, str, float]]) -> str:
+    """Render matches as prompt lines with SQL-quoted literals."""
+    lines = []
+    for table, column, value, _ in matches:
+        literal = value.replace("'", "''")
+        lines.append(f"- {table}.{column} = '{literal}'")
+    return "\n".join(lines)
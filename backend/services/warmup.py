@@ -0,0 +1,84 @@
+"""Background warm-up of the dataset store and slow imports on startup.
+
+Generated datasets are versioned by date, so they are warmed again right after
+midnight; otherwise the first request of the day would pay for the rebuild.
+Failed builds are retried with backoff.
+"""
+import asyncio
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from .dataset_store import ensure_dataset, get_value_index
+from .sample_data import DATASETS, get_datasets
+
+RETRY_SECONDS = 5
+MAX_RETRY_SECONDS = 300
+
+# Per-dataset warm-up status: "pending", "ready" or "failed: <error>"
+status = {}
+
+
+def enabled() -> bool:
+    return os.getenv("WARMUP", "1") != "0"
+
+
+def is_ready() -> bool:
+    """Every dataset is built and indexed; without warm-up, datasets are built on first use instead."""
+    if not enabled():
+        return True
+    return bool(status) and all(s == "ready" for s in status.values())
+
+
+async def warm_dataset(pool: ProcessPoolExecutor, dataset: str):
+    loop = asyncio.get_running_loop()
+    delay = RETRY_SECONDS
+    while True:
+        try:
+            # Generation runs in a separate process so it does not hold this worker's GIL
+            await loop.run_in_executor(pool, ensure_dataset, dataset)
+            await asyncio.to_thread(get_value_index, dataset)
+            status[dataset] = "ready"
+            return
+        except Exception as e:
+            status[dataset] = f"failed: {e}"
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+
+async def warm_datasets(datasets: list[str]):
+    workers = int(os.getenv("WARMUP_WORKERS", "0")) or min(len(datasets), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        await asyncio.gather(*(warm_dataset(pool, dataset) for dataset in datasets))
+    finally:
+        # Waiting for builds still running on cancellation would block the event loop until they finish
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def seconds_until_tomorrow() -> float:
+    midnight = datetime.combine(date.today() + timedelta(days=1), time.min)
+    return (midnight - datetime.now()).total_seconds() + 1
+
+
+async def rewarm_daily():
+    """Rebuild the generated datasets as soon as their version rolls over at midnight."""
+    while True:
+        await asyncio.sleep(seconds_until_tomorrow())
+        await warm_datasets(list(DATASETS))
+
+
+async def warm_up():
+    """Build every dataset in a process pool and preload modules deferred at import time."""
+    datasets = list(get_datasets())
+    for dataset in datasets:
+        status[dataset] = "pending"
+
+    await asyncio.gather(
+        asyncio.to_thread(importlib.import_module, "openai"),
+        asyncio.to_thread(importlib.import_module, "numpy"),
+        warm_datasets(datasets),
+        rewarm_daily(),
+        return_exceptions=True,
+    )
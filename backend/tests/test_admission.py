@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from services.admission import AdmissionController, QueueFull
+
+
+class AdmissionControllerTest(unittest.IsolatedAsyncioTestCase):
+    async def hold(self, controller, client, release, started=None, kind="query"):
+        async with controller.admit(client, kind):
+            if started is not None:
+                started.append(client)
+            await release.wait()
+
+    async def test_queued_client_does_not_block_other_clients(self):
+        controller = AdmissionController(slots=8, per_client=2, queue_size=32, client_queue_size=8)
+        release_a = asyncio.Event()
+        started = []
+        a_tasks = [asyncio.create_task(self.hold(controller, "a", release_a, started)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertEqual(started.count("a"), 2)
+        self.assertEqual(len(controller.waiters), 3)
+
+        release_b = asyncio.Event()
+        b_task = asyncio.create_task(self.hold(controller, "b", release_b, started))
+        await asyncio.sleep(0)
+        self.assertIn("b", started)
+        self.assertEqual(controller.active, 3)
+
+        release_a.set()
+        release_b.set()
+        await asyncio.gather(*a_tasks, b_task)
+        self.assertEqual(controller.active, 0)
+        self.assertEqual(controller.waiters, [])
+
+    async def test_freed_slot_goes_to_query_before_visualize(self):
+        controller = AdmissionController(slots=1, per_client=1, queue_size=4, client_queue_size=4)
+        release = asyncio.Event()
+        started = []
+        first = asyncio.create_task(self.hold(controller, "a", release, started))
+        await asyncio.sleep(0)
+        visualize = asyncio.create_task(self.hold(controller, "b", release, started, "visualize"))
+        query = asyncio.create_task(self.hold(controller, "c", release, started, "query"))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, visualize, query)
+        self.assertEqual(started, ["a", "c", "b"])
+
+    async def test_full_client_queue_is_rejected(self):
+        controller = AdmissionController(slots=1, per_client=1, queue_size=4, client_queue_size=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(self.hold(controller, "a", release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(QueueFull):
+            async with controller.admit("a", "query"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_waiter_cancelled_while_slot_is_released(self):
+        controller = AdmissionController(slots=1, per_client=1, queue_size=4, client_queue_size=4)
+        release = asyncio.Event()
+        started = []
+        first = asyncio.create_task(self.hold(controller, "a", release, started))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(self.hold(controller, "b", release, started))
+        last = asyncio.create_task(self.hold(controller, "c", release, started))
+        await asyncio.sleep(0)
+        # "a" releases its slot in the same loop tick as "b" is cancelled in the queue
+        release.set()
+        cancelled.cancel()
+        results = await asyncio.gather(first, cancelled, last, return_exceptions=True)
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertIsNone(results[2])
+        self.assertEqual(started, ["a", "c"])
+        self.assertEqual(controller.active, 0)
+        self.assertEqual(controller.in_flight, {})
+        self.assertEqual(controller.waiters, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
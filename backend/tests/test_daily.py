@@ -0,0 +1,46 @@
+import unittest
+from datetime import date, timedelta
+
+from services.daily import ID_STRIDE, first_id, history_window
+from services.sample_data import generate_sample_data, generate_sample_delta
+
+
+class DailyIdsTest(unittest.TestCase):
+    def test_first_id_increases_by_stride_per_day(self):
+        days = history_window(date(2026, 10, 19), 400)
+        ids = [first_id(day) for day in days]
+        self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all(b - a == ID_STRIDE for a, b in zip(ids, ids[1:])))
+
+    def test_row_ids_follow_their_day(self):
+        sales = generate_sample_data("sales", date(2026, 10, 19))["tables"]["sales"]
+        id_col, date_col = sales["columns"].index("id"), sales["columns"].index("date")
+        for row in sales["rows"]:
+            day = date.fromisoformat(row[date_col][:10])
+            self.assertGreaterEqual(row[id_col], first_id(day))
+            self.assertLess(row[id_col], first_id(day + timedelta(days=1)))
+
+
+class SampleDeltaTest(unittest.TestCase):
+    def test_delta_applied_to_old_version_gives_new_version(self):
+        since, as_of = date(2026, 10, 16), date(2026, 10, 19)
+        old = generate_sample_data("sales", since)["tables"]["sales"]["rows"]
+        new = generate_sample_data("sales", as_of)["tables"]["sales"]["rows"]
+        delta = generate_sample_delta("sales", since, as_of)["tables"]["sales"]
+
+        self.assertGreater(min(row[0] for row in delta["rows"]), max(row[0] for row in old))
+        kept = [row for row in old if row[0] >= delta["expired_before_id"]]
+        self.assertLess(len(kept), len(old))
+        self.assertEqual(sorted(kept + delta["rows"]), sorted(new))
+
+    def test_static_dataset_has_empty_delta(self):
+        delta = generate_sample_delta("hr", date(2026, 10, 18), date(2026, 10, 19))
+        self.assertEqual(delta["tables"], {})
+
+    def test_since_after_as_of_is_rejected(self):
+        with self.assertRaises(ValueError):
+            generate_sample_delta("sales", date(2026, 10, 20), date(2026, 10, 19))
+
+
+if __name__ == "__main__":
+    unittest.main()
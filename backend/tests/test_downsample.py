@@ -0,0 +1,54 @@
+import unittest
+from datetime import date, timedelta
+
+from services.downsample import MAX_POINTS, REDUCE_THRESHOLD, TOP_N, reduce_result
+
+ROWS = REDUCE_THRESHOLD * 2
+
+
+class ReduceResultTest(unittest.TestCase):
+    def test_small_result_is_untouched(self):
+        rows = [[i, i * 2] for i in range(10)]
+        self.assertEqual(reduce_result(["x", "y"], rows), (["x", "y"], rows, None))
+
+    def test_time_series_uses_lttb_and_keeps_endpoints(self):
+        start = date(2020, 1, 1)
+        rows = [[(start + timedelta(days=i)).isoformat(), i % 97] for i in range(ROWS)]
+        columns, reduced, reduction = reduce_result(["day", "value"], rows)
+        self.assertEqual(reduction["method"], "lttb")
+        self.assertEqual(columns, ["day", "value"])
+        self.assertLessEqual(len(reduced), MAX_POINTS)
+        self.assertEqual(reduced[0], rows[0])
+        self.assertEqual(reduced[-1], rows[-1])
+
+    def test_many_categories_use_top_n_with_other(self):
+        rows = [[f"c{i % 100}", 1] for i in range(ROWS)]
+        columns, reduced, reduction = reduce_result(["category", "amount"], rows)
+        self.assertEqual(reduction["method"], "top_n")
+        self.assertEqual(len(reduced), TOP_N)
+        self.assertEqual(reduced[-1][0], "Other")
+        self.assertEqual(sum(row[1] for row in reduced), ROWS)
+
+    def test_two_numeric_columns_use_grid(self):
+        rows = [[i, (i * 7919) % 1000] for i in range(ROWS)]
+        columns, reduced, reduction = reduce_result(["x", "y"], rows)
+        self.assertEqual(reduction["method"], "grid")
+        self.assertLessEqual(len(reduced), MAX_POINTS)
+        self.assertTrue(all(row in rows for row in reduced[:50]))
+
+    def test_single_numeric_column_uses_histogram(self):
+        rows = [[i % 500] for i in range(ROWS)]
+        columns, reduced, reduction = reduce_result(["value"], rows)
+        self.assertEqual(reduction["method"], "histogram")
+        self.assertEqual(sum(row[2] for row in reduced), ROWS)
+
+    def test_values_unlike_the_sampled_type_are_skipped(self):
+        # The type sample sees only numbers; the rest of the column is text
+        rows = [[i, i] if i < 1000 else [i, "n/a"] for i in range(ROWS)]
+        columns, reduced, reduction = reduce_result(["x", "y"], rows)
+        self.assertEqual(reduction["method"], "grid")
+        self.assertTrue(all(isinstance(row[1], int) for row in reduced))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from services.dataset_store import read_only
+from services.llm import validate_sql
+
+SCHEMA = "CREATE TABLE products (id INTEGER, name TEXT, price REAL);"
+
+
+class ValidateSqlTest(unittest.TestCase):
+    def test_select_is_valid(self):
+        self.assertIsNone(validate_sql("SELECT name, price FROM products WHERE price > 10", SCHEMA))
+        self.assertIsNone(validate_sql("WITH p AS (SELECT * FROM products) SELECT count(*) FROM p", SCHEMA))
+
+    def test_replace_function_is_allowed(self):
+        self.assertIsNone(validate_sql("SELECT REPLACE(name, 'a', 'b') FROM products", SCHEMA))
+
+    def test_writes_are_rejected(self):
+        for sql in (
+            "DELETE FROM products",
+            "WITH p AS (SELECT 1) DELETE FROM products",
+            "SELECT 1; DROP TABLE products",
+            "INSERT OR REPLACE INTO products VALUES (1, 'a', 1)",
+        ):
+            self.assertIsNotNone(validate_sql(sql, SCHEMA), sql)
+
+    def test_attach_is_rejected(self):
+        self.assertIsNotNone(validate_sql("ATTACH DATABASE 'x.db' AS x", SCHEMA))
+        self.assertIsNotNone(validate_sql("SELECT 1; ATTACH DATABASE 'x.db' AS x", SCHEMA))
+
+    def test_statements_in_client_schema_are_not_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "attached.db")
+            schema = f"{SCHEMA}\nATTACH DATABASE '{path}' AS x; CREATE TABLE x.t (a INTEGER);"
+            validate_sql("SELECT * FROM products", schema)
+            self.assertFalse(os.path.exists(path))
+
+    def test_unknown_column_is_rejected(self):
+        self.assertIn("no such column", validate_sql("SELECT nope FROM products", SCHEMA))
+
+
+class ReadOnlyAuthorizerTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(SCHEMA)
+        self.conn.set_authorizer(read_only)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_reads_are_allowed(self):
+        self.conn.execute("SELECT upper(name) FROM products").fetchall()
+        self.conn.execute(
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 3) SELECT * FROM c"
+        ).fetchall()
+
+    def test_everything_else_is_denied(self):
+        for sql in (
+            "DELETE FROM products",
+            "PRAGMA table_info(products)",
+            "SELECT * FROM pragma_table_info('products')",
+            "ATTACH DATABASE ':memory:' AS x",
+        ):
+            with self.assertRaises(sqlite3.DatabaseError, msg=sql):
+                self.conn.execute(sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
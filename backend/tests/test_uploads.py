@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import uploads
+
+HEADERS = {"X-Admin-Token": "secret"}
+
+
+class UploadChunkTest(unittest.TestCase):
+    def setUp(self):
+        self.store = tempfile.TemporaryDirectory()
+        env = {"DATASET_STORE_DIR": self.store.name, "ADMIN_TOKEN": "secret", "UPLOAD_MAX_MB": "1"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+        app = FastAPI()
+        app.include_router(uploads.router, prefix="/api")
+        self.client = TestClient(app)
+        response = self.client.post("/api/uploads", json={"dataset": "orders"}, headers=HEADERS)
+        self.upload_id = response.json()["id"]
+
+    def tearDown(self):
+        self.env.stop()
+        self.store.cleanup()
+
+    def put(self, offset: int, body: bytes):
+        return self.client.put(f"/api/uploads/{self.upload_id}?offset={offset}", content=body, headers=HEADERS)
+
+    def test_chunks_append_at_the_received_offset(self):
+        self.assertEqual(self.put(0, b"id,name\n").json()["received"], 8)
+        self.assertEqual(self.put(8, b"1,a\n").json()["received"], 12)
+
+    def test_mismatched_offset_is_rejected_with_409(self):
+        self.put(0, b"id,name\n")
+        for offset in (0, 4, 20):
+            response = self.put(offset, b"1,a\n")
+            self.assertEqual(response.status_code, 409)
+        # The rejected chunks were not written; the upload resumes from the reported size
+        received = self.client.get(f"/api/uploads/{self.upload_id}").json()["received"]
+        self.assertEqual(received, 8)
+        self.assertEqual(self.put(received, b"1,a\n").status_code, 200)
+
+    def test_oversized_chunk_is_rejected_with_413(self):
+        self.put(0, b"id,name\n")
+        self.assertEqual(self.put(8, b"1,a\n" * 300000).status_code, 413)
+        self.assertEqual(self.client.get(f"/api/uploads/{self.upload_id}").json()["received"], 8)
+
+    def test_writes_need_the_admin_token(self):
+        response = self.client.put(f"/api/uploads/{self.upload_id}?offset=0", content=b"id\n")
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
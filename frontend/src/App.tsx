@@ -8,7 +8,7 @@ import { ERDDiagram } from './components/ERDDiagram';
 import { DataExplorer } from './components/DataExplorer';
 import { useDatabase } from './hooks/useDatabase';
 import { useSavedQueries } from './hooks/useSavedQueries';
-import { fetchBusinessData, fetchDatasets, generateSQL } from './services/api';
+import { askQuestion, fetchBusinessData, fetchDatasets } from './services/api';
 import type { QueryResult, PlotlyConfig, SavedQuery, DatasetsMap } from './types';
 import './App.css';
 
@@ -127,12 +127,19 @@ function App() {
       setVizScript(null);
 
       try {
-        const sql = await generateSQL(question, schema);
+        // SQL, result and a visualization script in one round trip; the script is
+        // generated while the query runs and auto-runs once the result is set
+        const { sql, columns, rows, script, vizColumns, vizRows, reduction } = await askQuestion(
+          question,
+          currentDataset,
+          schema
+        );
         setCurrentQuestion(question);
         setCurrentSql(sql);
-
-        const result = executeQuery(sql);
-        setQueryResult(result);
+        // Large results come back already reduced, so the script runs without a /api/reduce round trip
+        const reduced = vizColumns && vizRows ? { columns: vizColumns, rows: vizRows, reduction } : null;
+        setQueryResult({ columns, rows, reduced });
+        setVizScript(script);
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Query failed');
         console.error(err);
@@ -140,7 +147,7 @@ function App() {
         setIsQuerying(false);
       }
     },
-    [schema, executeQuery]
+    [schema, currentDataset]
   );
 
   const handleSaveQuery = useCallback(
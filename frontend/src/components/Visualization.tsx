@@ -2,8 +2,8 @@ import { useState, useEffect, useRef } from 'react';
 import Plot from 'react-plotly.js';
 import Plotly from 'plotly.js-dist-min';
 import type { QueryResult, PlotlyConfig } from '../types';
-import { runInSandbox } from '../utils/sandbox';
-import { generateVisualizationScript } from '../services/api';
+import { runInSandbox, type SandboxResult } from '../utils/sandbox';
+import { generateVisualizationScript, reduceResult } from '../services/api';
 
 const DEFAULT_SCRIPT = `// Available: columns (string[]), rows (array of arrays)
 // Return a Plotly config object with 'data' and 'layout'
@@ -135,7 +135,7 @@ export function Visualization({
       // Delay execution to ensure DOM is ready (helps with map plots)
       const timeoutId = setTimeout(() => {
         console.log('Auto-running script with', result.rows.length, 'rows');
-        runInSandbox(vizScript, result.columns, result.rows).then((sandboxResult) => {
+        reduceResult(result).then((data) => runInSandbox(vizScript, data.columns, data.rows)).then((sandboxResult) => {
           console.log('Sandbox result:', sandboxResult.success, sandboxResult.error);
           if (sandboxResult.success && sandboxResult.result) {
             const config = sandboxResult.result as PlotlyConfig;
@@ -149,6 +149,8 @@ export function Visualization({
           } else {
             setScriptError(sandboxResult.error || 'Failed to run saved script');
           }
+        }).catch((e) => {
+          setScriptError(e instanceof Error ? e.message : 'Failed to run saved script');
         });
       }, 100);
 
@@ -165,7 +167,7 @@ export function Visualization({
     setScriptError(null);
 
     try {
-      const script = await generateVisualizationScript(
+      const { script, columns, rows } = await generateVisualizationScript(
         result.columns,
         result.rows,
         hint || undefined
@@ -178,8 +180,8 @@ export function Visualization({
       setScriptText(cleanedScript);
       onScriptChange(cleanedScript);
 
-      // Run the generated script
-      const sandboxResult = await runInSandbox(cleanedScript, result.columns, result.rows);
+      // Run the generated script, on the reduced rows when the server downsampled the result
+      const sandboxResult = await runInSandbox(cleanedScript, columns ?? result.columns, rows ?? result.rows);
       if (sandboxResult.success && sandboxResult.result) {
         const config = sandboxResult.result as PlotlyConfig;
         if (config.data && config.layout) {
@@ -214,7 +216,13 @@ export function Visualization({
     setIsRunningScript(true);
     setScriptError(null);
 
-    const sandboxResult = await runInSandbox(scriptText, result.columns, result.rows);
+    let sandboxResult: SandboxResult;
+    try {
+      const data = await reduceResult(result);
+      sandboxResult = await runInSandbox(scriptText, data.columns, data.rows);
+    } catch (e) {
+      sandboxResult = { success: false, error: e instanceof Error ? e.message : 'Failed to reduce query result' };
+    }
 
     if (sandboxResult.success && sandboxResult.result) {
       try {
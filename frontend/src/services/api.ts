@@ -1,7 +1,17 @@
-import type { BusinessData, DatasetsMap } from '../types';
+import type {
+  AskResult,
+  BusinessData,
+  DatasetsMap,
+  QueryResult,
+  ReducedResult,
+  VisualizationScript,
+} from '../types';
 
 const API_BASE = 'http://localhost:8000/api';
 
+// Results above this many rows are reduced server-side before plotting (matches REDUCE_THRESHOLD)
+export const VIZ_REDUCE_THRESHOLD = 5000;
+
 export async function fetchDatasets(): Promise<DatasetsMap> {
   const response = await fetch(`${API_BASE}/datasets`);
   if (!response.ok) {
@@ -18,17 +28,17 @@ export async function fetchBusinessData(dataset: string = 'sales'): Promise<Busi
   return response.json();
 }
 
-export async function generateSQL(question: string, schema: string): Promise<string> {
-  const response = await fetch(`${API_BASE}/query`, {
+export async function askQuestion(question: string, dataset: string, schema?: string): Promise<AskResult> {
+  const response = await fetch(`${API_BASE}/ask`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ question, schema }),
+    body: JSON.stringify({ question, dataset, schema }),
   });
   if (!response.ok) {
-    throw new Error('Failed to generate SQL');
+    const data = await response.json().catch(() => null);
+    throw new Error(data?.detail ?? 'Failed to answer question');
   }
-  const data = await response.json();
-  return data.sql;
+  return response.json();
 }
 
 export async function generateVisualization(
@@ -52,7 +62,7 @@ export async function generateVisualizationScript(
   columns: string[],
   sampleData: (string | number | null)[][],
   userHint?: string
-): Promise<string> {
+): Promise<VisualizationScript> {
   const response = await fetch(`${API_BASE}/visualize-script`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
@@ -61,6 +71,23 @@ export async function generateVisualizationScript(
   if (!response.ok) {
     throw new Error('Failed to generate visualization script');
   }
-  const data = await response.json();
-  return data.script;
+  return response.json();
+}
+
+export async function reduceResult(result: QueryResult): Promise<ReducedResult> {
+  if (result.reduced) {
+    return result.reduced;
+  }
+  if (result.rows.length <= VIZ_REDUCE_THRESHOLD) {
+    return { ...result, reduction: null };
+  }
+  const response = await fetch(`${API_BASE}/reduce`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ columns: result.columns, rows: result.rows }),
+  });
+  if (!response.ok) {
+    throw new Error('Failed to reduce query result');
+  }
+  return response.json();
 }
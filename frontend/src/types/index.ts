@@ -4,6 +4,7 @@ export interface TableData {
 }
 
 export interface BusinessData {
+  version?: string;
   tables: {
     [tableName: string]: TableData;
   };
@@ -12,6 +13,31 @@ export interface BusinessData {
 export interface QueryResult {
   columns: string[];
   rows: (string | number | null)[][];
+  // Rows to plot, when the server has already reduced the result (see /api/ask)
+  reduced?: ReducedResult | null;
+}
+
+export interface ReducedResult extends QueryResult {
+  reduction: Record<string, unknown> | null;
+}
+
+export interface VisualizationScript {
+  script: string;
+  columns?: string[] | null;
+  rows?: (string | number | null)[][] | null;
+  reduction?: Record<string, unknown> | null;
+  cached?: boolean;
+}
+
+export interface AskResult extends QueryResult {
+  sql: string;
+  truncated: boolean;
+  script: string | null;
+  scriptSource: 'speculative' | 'cached' | 'regenerated' | null;
+  vizColumns: string[] | null;
+  vizRows: (string | number | null)[][] | null;
+  reduction: Record<string, unknown> | null;
+  timings: Record<string, number>;
 }
 
 export interface SavedQuery {